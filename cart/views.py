@@ -1,11 +1,11 @@
 from django.shortcuts import render
-from django.shortcuts import get_object_or_404, redirect
-from movies.models import Movie
+from django.shortcuts import redirect
+from movies.services import MovieLookupService
 from .utils import calculate_cart_total
 from .models import Order, Item
 from django.contrib.auth.decorators import login_required
 from geographic.models import MoviePurchase, UserRegion
-from geographic.services import RegionService
+from geographic.services import PurchaseCounterService, RegionService
 
 def index(request):
     cart_total = 0
@@ -13,7 +13,7 @@ def index(request):
     cart = request.session.get('cart', {})
     movie_ids = list(cart.keys())
     if (movie_ids != []):
-        movies_in_cart = Movie.objects.filter(id__in=movie_ids)
+        movies_in_cart = list(MovieLookupService.get_many(movie_ids).values())
         cart_total = calculate_cart_total(cart, movies_in_cart)
 
     template_data = {}
@@ -23,7 +23,7 @@ def index(request):
     return render(request, 'cart/index.html', {'template_data': template_data})
 
 def add(request, id):
-    get_object_or_404(Movie, id=id)
+    MovieLookupService.get_or_404(id)
     cart = request.session.get('cart', {})
     cart[id] = request.POST['quantity']
     request.session['cart'] = cart
@@ -41,7 +41,7 @@ def purchase(request):
     if (movie_ids == []):
         return redirect('cart.index')
     
-    movies_in_cart = Movie.objects.filter(id__in=movie_ids)
+    movies_in_cart = list(MovieLookupService.get_many(movie_ids).values())
     cart_total = calculate_cart_total(cart, movies_in_cart)
 
     order = Order()
@@ -62,12 +62,13 @@ def purchase(request):
         
         # Track purchase for trending calculations if user has a region
         if user_region:
-            MoviePurchase.objects.create(
+            purchase = MoviePurchase.objects.create(
                 movie=movie,
                 user=request.user,
                 region=user_region,
                 quantity=cart[str(movie.id)]
             )
+            PurchaseCounterService.record_purchase(purchase)
 
     request.session['cart'] = {}
     template_data = {}
@@ -15,7 +15,7 @@ class UserRegionAdmin(admin.ModelAdmin):
 
 @admin.register(TrendingMovie)
 class TrendingMovieAdmin(admin.ModelAdmin):
-    list_display = ['movie', 'region', 'trending_score', 'purchase_count', 'view_count', 'period_start']
+    list_display = ['movie', 'region', 'trending_score', 'purchase_count', 'view_count', 'snapshot', 'period_start']
     list_filter = ['region', 'period_start', 'created_at']
     search_fields = ['movie__name', 'region__name']
     ordering = ['-trending_score']
@@ -0,0 +1,103 @@
+import random
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from movies.benchmarking import backdate, time_calls
+from movies.models import Movie
+from geographic.models import MoviePurchase, Region
+from geographic.services import PurchaseCounterService, TrendingCalculator
+
+
+def python_trending_for_region(region_id, limit=10, period_days=7):
+    """The previous row-by-row implementation, kept for comparison"""
+    region = Region.objects.get(id=region_id)
+    period_start = timezone.now() - timedelta(days=period_days)
+    purchases = MoviePurchase.objects.filter(
+        region=region, purchase_date__gte=period_start, purchase_date__lte=timezone.now()
+    )
+    movie_stats = {}
+    for purchase in purchases:
+        movie_id = purchase.movie.id
+        if movie_id not in movie_stats:
+            movie_stats[movie_id] = {'movie': purchase.movie, 'purchase_count': 0, 'total_quantity': 0}
+        movie_stats[movie_id]['purchase_count'] += 1
+        movie_stats[movie_id]['total_quantity'] += purchase.quantity
+    trending_movies = [
+        dict(stats, trending_score=stats['purchase_count'] * stats['total_quantity'])
+        for stats in movie_stats.values()
+    ]
+    trending_movies.sort(key=lambda x: x['trending_score'], reverse=True)
+    return trending_movies[:limit]
+
+
+def python_trending_for_all_regions():
+    return {
+        region.id: python_trending_for_region(region.id)
+        for region in Region.objects.filter(is_active=True)
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark counter-based trending against the row-by-row implementation (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='Purchases spread over the regions'
+        )
+        parser.add_argument('--movies', type=int, default=500, help='Movies the purchases are spread over')
+        parser.add_argument('--regions', type=int, default=50, help='Active regions')
+        parser.add_argument('--history-days', type=int, default=30, help='Spread of purchase dates')
+        parser.add_argument('--skip-python', action='store_true', help='Do not time the row-by-row implementation')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        self.stdout.write(f"{'purchases':>10} {'python':>12} {'counters':>12}")
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.create_data(size, options['movies'], options['regions'], options['history_days'])
+                calculator = TrendingCalculator()
+
+                python_text = '-'
+                if not options['skip_python']:
+                    python_ms, _ = time_calls(python_trending_for_all_regions, repeat=1)
+                    python_text = f'{python_ms:.1f}ms'
+                counters_ms, _ = time_calls(calculator.calculate_trending_for_all_regions)
+                self.stdout.write(f'{size:>10} {python_text:>12} {counters_ms:>10.1f}ms')
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; synthetic data rolled back'))
+
+    def create_data(self, size, movie_count, region_count, history_days):
+        """Purchases skewed towards a few popular movies, over regions that are the only active ones"""
+        Region.objects.update(is_active=False)
+        regions = Region.objects.bulk_create([
+            Region(name=f'Benchmark Region {i}', code=f'BR-{i}', latitude=0, longitude=0)
+            for i in range(region_count)
+        ])
+        movies = Movie.objects.bulk_create(
+            [Movie(name=f'Benchmark Movie {i}', price=1, description='', image='') for i in range(movie_count)]
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'bench-buyer-{i}', password='!') for i in range(1000)]
+        )
+        batch = []
+        for _ in range(size):
+            batch.append(MoviePurchase(
+                movie=movies[min(int(random.paretovariate(1.2)) - 1, movie_count - 1)],
+                user=random.choice(users),
+                region=random.choice(regions),
+                quantity=random.randint(1, 3)
+            ))
+            if len(batch) == 5000:
+                MoviePurchase.objects.bulk_create(batch)
+                batch = []
+        MoviePurchase.objects.bulk_create(batch)
+        backdate(
+            MoviePurchase.objects.filter(region__in=regions), 'purchase_date', timezone.now(), history_days * 86400
+        )
+        PurchaseCounterService.rebuild()
+        PurchaseCounterService.rebuild_scores()
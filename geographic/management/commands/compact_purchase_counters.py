@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from geographic.services import PurchaseCounterService, TrendingCalculator
+
+class Command(BaseCommand):
+    help = 'Roll old hourly purchase counters into daily ones (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days', type=int, default=PurchaseCounterService.HOURLY_RETENTION_DAYS,
+            help='Days of hourly buckets to keep; must cover the trending window'
+        )
+        parser.add_argument('--rebuild', action='store_true', help='Recompute all counters from MoviePurchase first')
+
+    def handle(self, *args, **options):
+        trending_days = TrendingCalculator().trending_period_days
+        if options['keep_days'] <= trending_days:
+            raise CommandError(
+                f"--keep-days must be greater than the {trending_days}-day trending window, "
+                "or trending scores lose hourly detail"
+            )
+        if options['rebuild']:
+            self.stdout.write('Rebuilding purchase counters...')
+            total = PurchaseCounterService.rebuild()
+            self.stdout.write(f'  {total} counters rebuilt')
+        removed = PurchaseCounterService.compact(options['keep_days'])
+        self.stdout.write(self.style.SUCCESS(f'Compacted {removed} hourly counters into daily ones'))
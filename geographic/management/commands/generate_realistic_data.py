@@ -2,7 +2,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from movies.models import Movie
 from geographic.models import Region, MoviePurchase, UserRegion
-from geographic.services import TrendingCalculator
+from geographic.services import PurchaseCounterService, TrendingCalculator
 from datetime import datetime, timedelta
 import random
 
@@ -101,6 +101,8 @@ class Command(BaseCommand):
                     total_purchases += 1
         
         # Update trending scores
+        PurchaseCounterService.rebuild()
+        PurchaseCounterService.rebuild_scores()
         calculator = TrendingCalculator()
         calculator.update_trending_scores()
         
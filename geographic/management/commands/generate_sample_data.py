@@ -2,7 +2,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from movies.models import Movie
 from geographic.models import Region, MoviePurchase, UserRegion
-from geographic.services import TrendingCalculator
+from geographic.services import PurchaseCounterService, TrendingCalculator
 from datetime import datetime, timedelta
 import random
 
@@ -66,6 +66,8 @@ class Command(BaseCommand):
             )
         
         # Update trending scores
+        PurchaseCounterService.rebuild()
+        PurchaseCounterService.rebuild_scores()
         calculator = TrendingCalculator()
         calculator.update_trending_scores()
         
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from geographic.services import PurchaseCounterService
+
+class Command(BaseCommand):
+    help = 'Recompute the decayed trending scores from MoviePurchase (run after changing the half-life)'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding trending scores...')
+        written = PurchaseCounterService.rebuild_scores()
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {written} trending scores'))
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from geographic.services import TrendingSnapshotService
+
+class Command(BaseCommand):
+    help = 'Refresh the trending snapshot served by the trending map on an interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Refresh the snapshot once and exit')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Seconds between refreshes (default: GEOGRAPHIC_TRENDING["REFRESH_INTERVAL"])'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or TrendingSnapshotService.get_refresh_interval()
+
+        if options['once']:
+            elapsed = self.refresh()
+            self.stdout.write(self.style.SUCCESS(f'Refreshed trending snapshot in {elapsed:.2f}s'))
+            return
+
+        self.stdout.write(f'Refreshing the trending snapshot every {interval}s (Ctrl+C to stop)...')
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    elapsed = self.refresh()
+                    self.stdout.write(f'  refreshed in {elapsed:.2f}s')
+                except Exception as e:
+                    # Keep serving the previous snapshot and try again next round
+                    self.stderr.write(f'  refresh failed: {e}')
+                time.sleep(max(0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Stopped'))
+
+    def refresh(self):
+        started = time.monotonic()
+        TrendingSnapshotService.refresh()
+        return time.monotonic() - started
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geographic', '0001_initial'),
+        ('movies', '0005_review_movie_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='moviepurchase',
+            index=models.Index(fields=['region', 'purchase_date'], name='geographic__region__7b6d03_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:06
+
+from datetime import timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+
+def backfill_purchase_counters(apps, schema_editor):
+    MoviePurchase = apps.get_model('geographic', 'MoviePurchase')
+    PurchaseCounter = apps.get_model('geographic', 'PurchaseCounter')
+    rows = MoviePurchase.objects.annotate(
+        bucket_start=TruncHour('purchase_date', tzinfo=timezone.utc)
+    ).values('region_id', 'movie_id', 'bucket_start').annotate(
+        purchase_count=Count('id'), total_quantity=Sum('quantity')
+    ).order_by()
+    PurchaseCounter.objects.bulk_create(
+        [PurchaseCounter(granularity='hour', **row) for row in rows.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geographic', '0002_purchase_region_date_index'),
+        ('movies', '0005_review_movie_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseCounter',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], default='hour', max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('purchase_count', models.IntegerField(default=0)),
+                ('total_quantity', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_counters', to='movies.movie')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_counters', to='geographic.region')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='geographic__granula_02a6ee_idx')],
+                'constraints': [models.UniqueConstraint(fields=('region', 'movie', 'granularity', 'bucket_start'), name='unique_purchase_counter_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_purchase_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:11
+
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_trending_scores(apps, schema_editor):
+    MoviePurchase = apps.get_model('geographic', 'MoviePurchase')
+    TrendingScore = apps.get_model('geographic', 'TrendingScore')
+    half_life = float(getattr(settings, 'GEOGRAPHIC_TRENDING', {}).get('HALF_LIFE_HOURS', 48)) * 3600
+    now = timezone.now()
+    scores = {}
+    for region_id, movie_id, purchase_date, quantity in MoviePurchase.objects.values_list(
+        'region_id', 'movie_id', 'purchase_date', 'quantity'
+    ).iterator():
+        elapsed = max((now - purchase_date).total_seconds(), 0)
+        key = (region_id, movie_id)
+        scores[key] = scores.get(key, 0.0) + quantity * 2 ** (-elapsed / half_life)
+    TrendingScore.objects.bulk_create(
+        [
+            TrendingScore(
+                region_id=region_id, movie_id=movie_id, score=score, updated_at=now,
+                rank_key=math.log2(score) + now.timestamp() / half_life
+            )
+            for (region_id, movie_id), score in scores.items() if score > 0
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geographic', '0003_purchase_counter'),
+        ('movies', '0005_review_movie_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField()),
+                ('rank_key', models.FloatField(default=0.0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='movies.movie')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='geographic.region')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['region', '-rank_key'], name='geographic__region__6edaf7_idx')],
+                'constraints': [models.UniqueConstraint(fields=('region', 'movie'), name='unique_trending_score_per_region')],
+            },
+        ),
+        migrations.RunPython(backfill_trending_scores, migrations.RunPython.noop),
+    ]
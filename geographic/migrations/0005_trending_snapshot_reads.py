@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geographic', '0004_trending_score'),
+        ('movies', '0005_review_movie_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendingmovie',
+            name='total_quantity',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='trendingmovie',
+            index=models.Index(fields=['period_end', 'region'], name='geographic__period__a3659b_idx'),
+        ),
+    ]
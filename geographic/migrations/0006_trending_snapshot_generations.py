@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def adopt_latest_snapshot(apps, schema_editor):
+    """Keep the newest legacy snapshot as the first generation and drop the rest"""
+    TrendingMovie = apps.get_model('geographic', 'TrendingMovie')
+    TrendingSnapshot = apps.get_model('geographic', 'TrendingSnapshot')
+    TrendingSnapshotPointer = apps.get_model('geographic', 'TrendingSnapshotPointer')
+    latest = TrendingMovie.objects.aggregate(latest=Max('period_end'))['latest']
+    if latest is None:
+        return
+    newest = TrendingMovie.objects.filter(period_end=latest)
+    first = newest.first()
+    snapshot = TrendingSnapshot.objects.create(
+        period_start=first.period_start, period_end=latest, published_at=latest
+    )
+    newest.update(snapshot=snapshot)
+    TrendingMovie.objects.filter(snapshot__isnull=True).delete()
+    TrendingSnapshotPointer.objects.create(id=1, snapshot=snapshot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geographic', '0005_trending_snapshot_reads'),
+        ('movies', '0005_review_movie_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrendingSnapshotPointer',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='trendingmovie',
+            name='geographic__period__a3659b_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='trendingmovie',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='trendingmovie',
+            name='snapshot',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='geographic.trendingsnapshot'),
+        ),
+        migrations.AddField(
+            model_name='trendingsnapshotpointer',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='geographic.trendingsnapshot'),
+        ),
+        migrations.RunPython(adopt_latest_snapshot, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='trendingmovie',
+            name='snapshot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='geographic.trendingsnapshot'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='trendingmovie',
+            unique_together={('snapshot', 'region', 'movie')},
+        ),
+    ]
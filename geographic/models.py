@@ -1,7 +1,16 @@
-from django.db import models
+import math
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from movies.models import Movie
 
+def get_half_life_seconds():
+    """Seconds for a trending score to halve"""
+    trending = getattr(settings, 'GEOGRAPHIC_TRENDING', {})
+    return float(trending.get('HALF_LIFE_HOURS', 48)) * 3600
+
 class Region(models.Model):
     """Represents a geographic region for trending movie analysis"""
     id = models.AutoField(primary_key=True)
@@ -25,12 +34,40 @@ class UserRegion(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.region.name}"
 
+class TrendingSnapshot(models.Model):
+    """One generation of materialized TrendingMovie rows
+    
+    A generation's rows are written before it is published, and readers
+    only follow TrendingSnapshotPointer, so they never see a partial one.
+    """
+    id = models.BigAutoField(primary_key=True)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Trending snapshot {self.id} ({self.period_start} - {self.period_end})"
+
+class TrendingSnapshotPointer(models.Model):
+    """Single row naming the trending generation readers see"""
+    CURRENT = 1
+    
+    id = models.PositiveSmallIntegerField(primary_key=True, default=CURRENT)
+    snapshot = models.ForeignKey(TrendingSnapshot, on_delete=models.PROTECT, related_name='+')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Current trending snapshot: {self.snapshot_id}"
+
 class TrendingMovie(models.Model):
     """Tracks trending movies by region and time period"""
     id = models.AutoField(primary_key=True)
+    snapshot = models.ForeignKey(TrendingSnapshot, on_delete=models.CASCADE, related_name='entries')
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     region = models.ForeignKey(Region, on_delete=models.CASCADE)
     purchase_count = models.IntegerField(default=0)
+    total_quantity = models.IntegerField(default=0)
     view_count = models.IntegerField(default=0)
     trending_score = models.FloatField(default=0.0)
     period_start = models.DateTimeField()
@@ -38,7 +75,7 @@ class TrendingMovie(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ['movie', 'region', 'period_start']
+        unique_together = ['snapshot', 'region', 'movie']
         ordering = ['-trending_score']
     
     def __str__(self):
@@ -53,5 +90,137 @@ class MoviePurchase(models.Model):
     purchase_date = models.DateTimeField(auto_now_add=True)
     quantity = models.IntegerField(default=1)
     
+    class Meta:
+        indexes = [
+            # Trending reads one time window across all regions
+            models.Index(fields=['region', 'purchase_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} purchased {self.movie.name} in {self.region.name}"
+
+class PurchaseCounter(models.Model):
+    """Purchase totals per region, movie and time bucket
+
+    Each purchase is added to its hour's bucket. Compaction rolls hours
+    that have left the trending window into one bucket per day, so
+    trending sums a bounded number of rows per (region, movie) instead
+    of scanning MoviePurchase.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    id = models.BigAutoField(primary_key=True)
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='purchase_counters')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='purchase_counters')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES, default=HOUR)
+    bucket_start = models.DateTimeField()
+    purchase_count = models.IntegerField(default=0)
+    total_quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['region', 'movie', 'granularity', 'bucket_start'], name='unique_purchase_counter_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start']),
+        ]
+
     def __str__(self):
-        return f"{self.user.username} purchased {self.movie.name} in {self.region.name}"
\ No newline at end of file
+        return f"{self.movie_id} in {self.region_id} from {self.bucket_start} ({self.granularity}): {self.purchase_count}"
+
+    @staticmethod
+    def hour_of(moment):
+        """Start of the hourly bucket a moment falls in (UTC)"""
+        return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def day_of(moment):
+        """Start of the daily bucket a moment falls in (UTC)"""
+        return PurchaseCounter.hour_of(moment).replace(hour=0)
+
+    @classmethod
+    def add(cls, region, movie, moment, quantity, purchase_count=1):
+        """Add purchases to an hourly bucket with a single upsert"""
+        region_id = getattr(region, 'pk', region)
+        movie_id = getattr(movie, 'pk', movie)
+        bucket = {
+            'region_id': region_id,
+            'movie_id': movie_id,
+            'granularity': cls.HOUR,
+            'bucket_start': cls.hour_of(moment),
+        }
+        cls.objects.bulk_create([cls(**bucket)], ignore_conflicts=True)
+        cls.objects.filter(**bucket).update(
+            purchase_count=F('purchase_count') + purchase_count,
+            total_quantity=F('total_quantity') + quantity
+        )
+
+
+class TrendingScore(models.Model):
+    """Exponentially decayed purchase score per region and movie
+
+    ``score`` was exact at ``updated_at`` and halves every half-life after
+    it. A purchase decays the stored value forward to its own time and adds
+    its quantity, so updates and reads never look at purchase history.
+    ``rank_key`` is log2 of the score plus the half-lives elapsed since the
+    epoch at ``updated_at``. All scores decay at the same rate, so ordering
+    by it ranks movies by their current score.
+    """
+    id = models.BigAutoField(primary_key=True)
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='trending_scores')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='trending_scores')
+    score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField()
+    rank_key = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'movie'], name='unique_trending_score_per_region'),
+        ]
+        indexes = [
+            models.Index(fields=['region', '-rank_key']),
+        ]
+
+    def __str__(self):
+        return f"{self.movie_id} in {self.region_id}: {self.score:.2f} at {self.updated_at}"
+
+    @staticmethod
+    def decay(score, seconds, half_life=None):
+        """A score's value ``seconds`` later"""
+        return score * 2 ** (-seconds / (half_life or get_half_life_seconds()))
+
+    @staticmethod
+    def make_rank_key(score, moment, half_life=None):
+        half_life = half_life or get_half_life_seconds()
+        return math.log2(score) + moment.timestamp() / half_life if score > 0 else float('-inf')
+
+    def score_at(self, moment):
+        """The score decayed to a moment at or after updated_at"""
+        return self.decay(self.score, (moment - self.updated_at).total_seconds())
+
+    def add(self, moment, weight):
+        """Add a purchase made at ``moment`` to the score"""
+        half_life = get_half_life_seconds()
+        if moment >= self.updated_at:
+            self.score = self.decay(self.score, (moment - self.updated_at).total_seconds(), half_life) + weight
+            self.updated_at = moment
+        else:
+            # A purchase recorded late counts as already decayed
+            self.score += self.decay(weight, (self.updated_at - moment).total_seconds(), half_life)
+        self.rank_key = self.make_rank_key(self.score, self.updated_at, half_life)
+
+    @classmethod
+    def record(cls, region, movie, moment, weight):
+        """Add a purchase to its (region, movie) score, reading and writing one row"""
+        with transaction.atomic():
+            row, _ = cls.objects.select_for_update().get_or_create(
+                region_id=getattr(region, 'pk', region),
+                movie_id=getattr(movie, 'pk', movie),
+                defaults={'updated_at': moment}
+            )
+            row.add(moment, weight)
+            row.save(update_fields=['score', 'updated_at', 'rank_key'])
@@ -1,8 +1,13 @@
-from django.db.models import Count, Sum, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum, Q, Window
+from django.db.models.functions import RowNumber, TruncDay, TruncHour
 from django.utils import timezone
-from datetime import timedelta
-from .models import Region, TrendingMovie, MoviePurchase, UserRegion
+from datetime import timedelta, timezone as dt_timezone
+from .models import Region, TrendingMovie, TrendingScore, TrendingSnapshot, TrendingSnapshotPointer, MoviePurchase, PurchaseCounter, UserRegion, get_half_life_seconds
+from movies.cache import SINGLE_FLIGHT_LOCK_TIMEOUT, get_or_compute
 from movies.models import Movie
+from movies.services import MovieLookupService
 
 class TrendingCalculator:
     """Service class for calculating trending movies by region"""
@@ -10,90 +15,401 @@ class TrendingCalculator:
     def __init__(self):
         self.trending_period_days = 7  # Calculate trending over last 7 days
     
-    def calculate_trending_for_region(self, region_id, limit=10):
-        """Calculate trending movies for a specific region"""
-        region = Region.objects.get(id=region_id)
-        period_start = timezone.now() - timedelta(days=self.trending_period_days)
+    def get_period(self):
+        """(period_start, period_end) of the trending window ending now"""
         period_end = timezone.now()
+        return period_end - timedelta(days=self.trending_period_days), period_end
+    
+    def get_window_stats(self, region_ids, period_start, period_end):
+        """Yield (region_id, movie_id, purchase_count, total_quantity) for the window
         
-        # Get purchase data for the region in the time period
-        purchases = MoviePurchase.objects.filter(
-            region=region,
-            purchase_date__gte=period_start,
-            purchase_date__lte=period_end
-        )
+        Sums the PurchaseCounter buckets that start inside the window, so
+        the work depends on the number of (region, movie) pairs rather
+        than on purchase volume. The window is widened to the start of
+        the bucket holding period_start.
+        """
+        return PurchaseCounter.objects.filter(
+            Q(granularity=PurchaseCounter.HOUR, bucket_start__gte=PurchaseCounter.hour_of(period_start))
+            | Q(granularity=PurchaseCounter.DAY, bucket_start__gte=PurchaseCounter.day_of(period_start)),
+            region_id__in=region_ids,
+            bucket_start__lte=period_end
+        ).values('region_id', 'movie_id').annotate(
+            purchase_count_sum=Sum('purchase_count'),
+            total_quantity_sum=Sum('total_quantity')
+        ).values_list('region_id', 'movie_id', 'purchase_count_sum', 'total_quantity_sum').order_by()
+    
+    def get_top_scores(self, region_ids, limit):
+        """Yield (region_id, movie_id, score) of each region's ``limit`` highest decayed scores
         
-        # Calculate trending scores for each movie
-        movie_stats = {}
-        for purchase in purchases:
-            movie_id = purchase.movie.id
-            if movie_id not in movie_stats:
-                movie_stats[movie_id] = {
-                    'movie': purchase.movie,
-                    'purchase_count': 0,
-                    'total_quantity': 0
-                }
-            movie_stats[movie_id]['purchase_count'] += 1
-            movie_stats[movie_id]['total_quantity'] += purchase.quantity
-        
-        # Calculate trending score (purchase count * quantity * recency factor)
-        trending_movies = []
-        for movie_id, stats in movie_stats.items():
-            # Simple trending score: purchase count * total quantity
-            # In a real implementation, you might add recency weighting
-            trending_score = stats['purchase_count'] * stats['total_quantity']
-            
-            trending_movies.append({
-                'movie': stats['movie'],
-                'purchase_count': stats['purchase_count'],
-                'total_quantity': stats['total_quantity'],
-                'trending_score': trending_score
-            })
+        Ranked by rank_key in a single windowed query over the
+        (region, -rank_key) index; scores are decayed to now.
+        """
+        now = timezone.now()
+        rows = TrendingScore.objects.filter(region_id__in=region_ids).annotate(
+            position=Window(
+                RowNumber(), partition_by=F('region_id'), order_by=[F('rank_key').desc(), F('movie_id').asc()]
+            )
+        ).filter(position__lte=limit).order_by('region_id', 'position')
+        for score in rows:
+            yield score.region_id, score.movie_id, score.score_at(now)
+    
+    def calculate_trending_for_regions(self, region_ids, limit=10):
+        """Calculate trending movies for many regions at once
         
-        # Sort by trending score and return top movies
-        trending_movies.sort(key=lambda x: x['trending_score'], reverse=True)
-        return trending_movies[:limit]
+        Movies are ranked by their decayed purchase score. Purchase counts
+        over the trending window are reported alongside. Returns
+        {region_id: [movie_data, ...]} with every requested region
+        present, best first.
+        """
+        top = list(self.get_top_scores(region_ids, limit))
+        movie_ids = {movie_id for _, movie_id, _ in top}
+        
+        period_start, period_end = self.get_period()
+        window_stats = {
+            (region_id, movie_id): (purchase_count, total_quantity)
+            for region_id, movie_id, purchase_count, total_quantity in self.get_window_stats(
+                region_ids, period_start, period_end
+            ).filter(movie_id__in=movie_ids)
+        }
+        
+        movies = MovieLookupService.get_many(movie_ids)
+        trending = {region_id: [] for region_id in region_ids}
+        for region_id, movie_id, score in top:
+            if movie_id not in movies:
+                continue
+            purchase_count, total_quantity = window_stats.get((region_id, movie_id), (0, 0))
+            trending[region_id].append({
+                'movie': movies[movie_id],
+                'purchase_count': purchase_count,
+                'total_quantity': total_quantity,
+                'trending_score': round(score, 2)
+            })
+        return trending
+    
+    def calculate_trending_for_region(self, region_id, limit=10):
+        """Calculate trending movies for a specific region"""
+        region = Region.objects.get(id=region_id)
+        return self.calculate_trending_for_regions([region.id], limit)[region.id]
     
-    def calculate_trending_for_all_regions(self):
+    def calculate_trending_for_all_regions(self, limit=10):
         """Calculate trending movies for all active regions"""
-        regions = Region.objects.filter(is_active=True)
-        all_trending = {}
+        regions = {region.id: region for region in Region.objects.filter(is_active=True)}
+        trending = self.calculate_trending_for_regions(list(regions), limit)
         
-        for region in regions:
-            trending = self.calculate_trending_for_region(region.id)
-            all_trending[region.id] = {
+        return {
+            region_id: {
                 'region': region,
-                'trending_movies': trending
+                'trending_movies': trending[region_id]
             }
-        
-        return all_trending
+            for region_id, region in regions.items()
+        }
     
-    def update_trending_scores(self):
-        """Update trending scores in the database"""
-        period_start = timezone.now() - timedelta(days=self.trending_period_days)
-        period_end = timezone.now()
-        
-        # Clear existing trending data for this period
-        TrendingMovie.objects.filter(
-            period_start=period_start,
-            period_end=period_end
-        ).delete()
+    def update_trending_scores(self, keep=None):
+        """Write a new trending snapshot generation, publish it and prune old ones
         
-        # Calculate and save new trending data
+        The rows go into a fresh generation that readers cannot see yet.
+        Swapping TrendingSnapshotPointer to it is a single-row write, so
+        readers move from one complete generation to the next. Returns the
+        published TrendingSnapshot.
+        """
+        period_start, period_end = self.get_period()
         all_trending = self.calculate_trending_for_all_regions()
         
-        for region_id, data in all_trending.items():
-            region = data['region']
-            for movie_data in data['trending_movies']:
-                TrendingMovie.objects.create(
+        snapshot = TrendingSnapshot.objects.create(period_start=period_start, period_end=period_end)
+        TrendingMovie.objects.bulk_create(
+            [
+                TrendingMovie(
+                    snapshot=snapshot,
                     movie=movie_data['movie'],
-                    region=region,
+                    region=data['region'],
                     purchase_count=movie_data['purchase_count'],
+                    total_quantity=movie_data['total_quantity'],
                     view_count=0,  # Could be implemented later
                     trending_score=movie_data['trending_score'],
                     period_start=period_start,
                     period_end=period_end
                 )
+                for data in all_trending.values()
+                for movie_data in data['trending_movies']
+            ],
+            batch_size=1000
+        )
+        
+        with transaction.atomic():
+            snapshot.published_at = timezone.now()
+            snapshot.save(update_fields=['published_at'])
+            TrendingSnapshotPointer.objects.update_or_create(
+                id=TrendingSnapshotPointer.CURRENT, defaults={'snapshot': snapshot}
+            )
+        
+        self.prune_snapshots(keep)
+        return snapshot
+    
+    @staticmethod
+    def prune_snapshots(keep=None):
+        """Delete generations older than the newest ``keep`` published ones
+        
+        Generations still being written are newer than the current one
+        and survive. Returns how many generations were deleted.
+        """
+        if keep is None:
+            keep = int(getattr(settings, 'GEOGRAPHIC_TRENDING', {}).get('SNAPSHOTS_KEPT', 3))
+        published = TrendingSnapshot.objects.filter(published_at__isnull=False).order_by('-id')
+        kept = list(published.values_list('id', flat=True)[:max(keep, 1)])
+        current = TrendingSnapshotPointer.objects.filter(
+            id=TrendingSnapshotPointer.CURRENT
+        ).values_list('snapshot_id', flat=True).first()
+        if current is not None:
+            kept.append(current)
+        if not kept:
+            return 0
+        oldest_kept = min(kept)
+        with transaction.atomic():
+            TrendingMovie.objects.filter(snapshot_id__lt=oldest_kept).delete()
+            deleted, _ = TrendingSnapshot.objects.filter(id__lt=oldest_kept).delete()
+        return deleted
+
+class PurchaseCounterService:
+    """Service class for maintaining the hourly and daily PurchaseCounter buckets"""
+    
+    # Hours stay hourly while they can still be inside the trending window
+    HOURLY_RETENTION_DAYS = 8
+    
+    @staticmethod
+    def record_purchase(purchase):
+        """Count a newly created MoviePurchase in its hourly bucket and decayed score"""
+        quantity = int(purchase.quantity)
+        PurchaseCounter.add(purchase.region_id, purchase.movie_id, purchase.purchase_date, quantity)
+        TrendingScore.record(purchase.region_id, purchase.movie_id, purchase.purchase_date, quantity)
+    
+    @staticmethod
+    def rebuild():
+        """Recompute every bucket from MoviePurchase and return how many there are"""
+        rows = MoviePurchase.objects.annotate(
+            bucket_start=TruncHour('purchase_date', tzinfo=dt_timezone.utc)
+        ).values('region_id', 'movie_id', 'bucket_start').annotate(
+            purchase_count=Count('id'), total_quantity=Sum('quantity')
+        ).order_by()
+        with transaction.atomic():
+            PurchaseCounter.objects.all().delete()
+            PurchaseCounter.objects.bulk_create(
+                (PurchaseCounter(granularity=PurchaseCounter.HOUR, **row) for row in rows.iterator()),
+                batch_size=1000
+            )
+        PurchaseCounterService.compact()
+        return PurchaseCounter.objects.count()
+    
+    @staticmethod
+    def rebuild_scores():
+        """Recompute every decayed score from MoviePurchase and return how many were written
+        
+        Needed after changing the half-life. Scores are decayed to now.
+        """
+        now = timezone.now()
+        half_life = get_half_life_seconds()
+        scores = {}
+        purchases = MoviePurchase.objects.values_list('region_id', 'movie_id', 'purchase_date', 'quantity')
+        for region_id, movie_id, purchase_date, quantity in purchases.iterator(chunk_size=10000):
+            key = (region_id, movie_id)
+            elapsed = max((now - purchase_date).total_seconds(), 0)
+            scores[key] = scores.get(key, 0.0) + TrendingScore.decay(quantity, elapsed, half_life)
+        
+        with transaction.atomic():
+            TrendingScore.objects.all().delete()
+            TrendingScore.objects.bulk_create(
+                [
+                    TrendingScore(
+                        region_id=region_id, movie_id=movie_id, score=score, updated_at=now,
+                        rank_key=TrendingScore.make_rank_key(score, now, half_life)
+                    )
+                    for (region_id, movie_id), score in scores.items()
+                ],
+                batch_size=1000
+            )
+        return len(scores)
+    
+    @staticmethod
+    def compact(keep_days=None):
+        """Roll hourly buckets of days older than keep_days into daily buckets
+        
+        Works one day at a time, each in its own transaction, and returns
+        how many hourly rows were removed.
+        """
+        if keep_days is None:
+            keep_days = PurchaseCounterService.HOURLY_RETENTION_DAYS
+        cutoff = PurchaseCounter.day_of(timezone.now() - timedelta(days=keep_days))
+        hourly = PurchaseCounter.objects.filter(granularity=PurchaseCounter.HOUR, bucket_start__lt=cutoff)
+        days = hourly.annotate(
+            day=TruncDay('bucket_start', tzinfo=dt_timezone.utc)
+        ).values_list('day', flat=True).distinct().order_by('day')
+        
+        removed = 0
+        for day in list(days):
+            with transaction.atomic():
+                day_hours = hourly.filter(bucket_start__gte=day, bucket_start__lt=day + timedelta(days=1))
+                totals = day_hours.values('region_id', 'movie_id').annotate(
+                    count_sum=Sum('purchase_count'), quantity_sum=Sum('total_quantity')
+                ).order_by()
+                existing = {
+                    (counter.region_id, counter.movie_id): counter
+                    for counter in PurchaseCounter.objects.select_for_update().filter(
+                        granularity=PurchaseCounter.DAY, bucket_start=day
+                    )
+                }
+                to_create = []
+                to_update = []
+                for row in totals:
+                    counter = existing.get((row['region_id'], row['movie_id']))
+                    if counter is None:
+                        to_create.append(PurchaseCounter(
+                            region_id=row['region_id'], movie_id=row['movie_id'],
+                            granularity=PurchaseCounter.DAY, bucket_start=day,
+                            purchase_count=row['count_sum'], total_quantity=row['quantity_sum']
+                        ))
+                    else:
+                        counter.purchase_count += row['count_sum']
+                        counter.total_quantity += row['quantity_sum']
+                        to_update.append(counter)
+                PurchaseCounter.objects.bulk_create(to_create, batch_size=1000)
+                PurchaseCounter.objects.bulk_update(to_update, ['purchase_count', 'total_quantity'], batch_size=1000)
+                removed += day_hours.delete()[0]
+        return removed
+
+class TrendingSnapshotService:
+    """Service class for serving the published TrendingMovie snapshot
+    
+    The trending_worker command materializes a snapshot every
+    REFRESH_INTERVAL seconds; requests only read it. Serialized payloads
+    are cached under the snapshot's id, so a newly published generation
+    is picked up by every process without explicit invalidation.
+    """
+    
+    CACHE_TIMEOUT = 60 * 60
+    
+    @staticmethod
+    def get_refresh_interval():
+        return float(getattr(settings, 'GEOGRAPHIC_TRENDING', {}).get('REFRESH_INTERVAL', 300))
+    
+    @staticmethod
+    def refresh():
+        """Materialize a new snapshot from the current trending scores"""
+        TrendingCalculator().update_trending_scores()
+    
+    FIRST_BUILD_KEY = 'geographic:trending:first_snapshot'
+    
+    @staticmethod
+    def get_published():
+        pointer = TrendingSnapshotPointer.objects.select_related('snapshot').filter(
+            id=TrendingSnapshotPointer.CURRENT
+        ).first()
+        return pointer.snapshot if pointer is not None else None
+    
+    @staticmethod
+    def get_current():
+        """The published TrendingSnapshot, materializing the first one if none exists yet
+        
+        Concurrent requests that find no snapshot wait for a single build.
+        """
+        snapshot = TrendingSnapshotService.get_published()
+        if snapshot is not None:
+            return snapshot
+        
+        def build():
+            # A request that held the lock before us may have published one
+            published = TrendingSnapshotService.get_published()
+            return (published or TrendingCalculator().update_trending_scores()).id
+        
+        _, snapshot_id = get_or_compute(
+            TrendingSnapshotService.FIRST_BUILD_KEY, build,
+            TrendingSnapshotService.get_refresh_interval(), wait=SINGLE_FLIGHT_LOCK_TIMEOUT
+        )
+        return TrendingSnapshot.objects.get(id=snapshot_id)
+    
+    @staticmethod
+    def serialize_region(region):
+        return {
+            'id': region.id,
+            'name': region.name,
+            'code': region.code,
+            'latitude': region.latitude,
+            'longitude': region.longitude,
+            'population': region.population
+        }
+    
+    @staticmethod
+    def load_entries(snapshot, region_ids=None):
+        """{region_id: [(TrendingMovie, Movie), ...]} of a snapshot, best first"""
+        rows = TrendingMovie.objects.filter(snapshot=snapshot)
+        if region_ids is not None:
+            rows = rows.filter(region_id__in=region_ids)
+        rows = list(rows.order_by('region_id', '-trending_score', 'movie_id'))
+        movies = MovieLookupService.get_many(row.movie_id for row in rows)
+        
+        entries = {}
+        for row in rows:
+            if row.movie_id in movies:
+                entries.setdefault(row.region_id, []).append((row, movies[row.movie_id]))
+        return entries
+    
+    @staticmethod
+    def build_all_regions(snapshot):
+        entries = TrendingSnapshotService.load_entries(snapshot)
+        return {
+            region.id: {
+                'region': TrendingSnapshotService.serialize_region(region),
+                'trending_movies': [
+                    {
+                        'id': movie.id,
+                        'name': movie.name,
+                        'price': movie.price,
+                        'image': movie.thumbnail_url,
+                        'purchase_count': row.purchase_count,
+                        'trending_score': row.trending_score
+                    }
+                    for row, movie in entries.get(region.id, [])
+                ]
+            }
+            for region in Region.objects.filter(is_active=True)
+        }
+    
+    @staticmethod
+    def build_region(snapshot, region_id):
+        entries = TrendingSnapshotService.load_entries(snapshot, [region_id])
+        return [
+            {
+                'id': movie.id,
+                'name': movie.name,
+                'price': movie.price,
+                'description': movie.description,
+                'image': movie.thumbnail_url,
+                'purchase_count': row.purchase_count,
+                'total_quantity': row.total_quantity,
+                'trending_score': row.trending_score
+            }
+            for row, movie in entries.get(region_id, [])
+        ]
+    
+    @staticmethod
+    def get_all_regions():
+        """(snapshot_at, serialized trending movies of every active region)"""
+        snapshot = TrendingSnapshotService.get_current()
+        _, data = get_or_compute(
+            f'geographic:trending:{snapshot.id}:all',
+            lambda: TrendingSnapshotService.build_all_regions(snapshot),
+            TrendingSnapshotService.CACHE_TIMEOUT
+        )
+        return snapshot.period_end, data
+    
+    @staticmethod
+    def get_region(region_id):
+        """(snapshot_at, serialized trending movies of one region)"""
+        snapshot = TrendingSnapshotService.get_current()
+        _, data = get_or_compute(
+            f'geographic:trending:{snapshot.id}:region:{region_id}',
+            lambda: TrendingSnapshotService.build_region(snapshot, region_id),
+            TrendingSnapshotService.CACHE_TIMEOUT
+        )
+        return snapshot.period_end, data
 
 class RegionService:
     """Service class for managing regions and user locations"""
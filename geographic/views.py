@@ -5,9 +5,10 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.utils import timezone
 import json
 from .models import Region, TrendingMovie, UserRegion
-from .services import TrendingCalculator, RegionService
+from .services import RegionService, TrendingSnapshotService
 
 class TrendingMapView(View):
     """View for the trending movies map page"""
@@ -20,42 +21,23 @@ class TrendingMapView(View):
         }
         return render(request, 'geographic/trending_map.html', context)
 
+def snapshot_age(snapshot_at):
+    """Fields telling clients how old the served snapshot is"""
+    return {
+        'snapshot_at': snapshot_at.isoformat(),
+        'age_seconds': round(max((timezone.now() - snapshot_at).total_seconds(), 0), 1)
+    }
+
 @login_required
 def trending_data_api(request):
     """API endpoint to get trending movies data for all regions"""
     try:
-        calculator = TrendingCalculator()
-        trending_data = calculator.calculate_trending_for_all_regions()
-        
-        # Format data for frontend
-        formatted_data = {}
-        for region_id, data in trending_data.items():
-            region = data['region']
-            formatted_data[region_id] = {
-                'region': {
-                    'id': region.id,
-                    'name': region.name,
-                    'code': region.code,
-                    'latitude': region.latitude,
-                    'longitude': region.longitude,
-                    'population': region.population
-                },
-                'trending_movies': [
-                    {
-                        'id': movie_data['movie'].id,
-                        'name': movie_data['movie'].name,
-                        'price': movie_data['movie'].price,
-                        'image': movie_data['movie'].image.url if movie_data['movie'].image else None,
-                        'purchase_count': movie_data['purchase_count'],
-                        'trending_score': movie_data['trending_score']
-                    }
-                    for movie_data in data['trending_movies']
-                ]
-            }
+        snapshot_at, formatted_data = TrendingSnapshotService.get_all_regions()
         
         return JsonResponse({
             'success': True,
-            'data': formatted_data
+            'data': formatted_data,
+            **snapshot_age(snapshot_at)
         })
     except Exception as e:
         return JsonResponse({
@@ -67,26 +49,18 @@ def trending_data_api(request):
 def region_trending_api(request, region_id):
     """API endpoint to get trending movies for a specific region"""
     try:
-        calculator = TrendingCalculator()
-        trending_movies = calculator.calculate_trending_for_region(region_id)
+        if not Region.objects.filter(id=region_id).exists():
+            return JsonResponse({
+                'success': False,
+                'error': 'Region not found'
+            }, status=404)
         
-        formatted_movies = [
-            {
-                'id': movie_data['movie'].id,
-                'name': movie_data['movie'].name,
-                'price': movie_data['movie'].price,
-                'description': movie_data['movie'].description,
-                'image': movie_data['movie'].image.url if movie_data['movie'].image else None,
-                'purchase_count': movie_data['purchase_count'],
-                'total_quantity': movie_data['total_quantity'],
-                'trending_score': movie_data['trending_score']
-            }
-            for movie_data in trending_movies
-        ]
+        snapshot_at, formatted_movies = TrendingSnapshotService.get_region(region_id)
         
         return JsonResponse({
             'success': True,
-            'data': formatted_movies
+            'data': formatted_movies,
+            **snapshot_age(snapshot_at)
         })
     except Exception as e:
         return JsonResponse({
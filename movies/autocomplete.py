@@ -0,0 +1,176 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'movies:autocomplete:version'
+
+
+class PrefixIndex:
+    """In-process sorted index of movie names for typeahead lookups.
+
+    Every word start of a title is stored as a key in one sorted list, so
+    both "dark" and "knight" find "The Dark Knight". A prefix query is two
+    bisections plus a top-k pick by popularity (RatingAggregate.total_ratings).
+    The database is never touched while answering queries.
+
+    Changes made in this process are applied incrementally. Changes made
+    elsewhere (other workers, management commands) bump a shared version in
+    the cache, and the index reloads itself when it notices a new version.
+    """
+
+    REFRESH_INTERVAL = 30
+    # Results are memoized in a bounded LRU. Renames clear it immediately;
+    # popularity changes only reorder results, so they wait for the next
+    # periodic refresh instead of flushing the memo on every rating.
+    MEMO_SIZE = 10000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._movies = {}
+        self._memo = OrderedDict()
+        self._loaded = False
+        self._version = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(text.lower().split())
+
+    @classmethod
+    def word_keys(cls, name):
+        words = cls.normalize(name).split(' ')
+        return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+    def warm(self):
+        """Load the full index from the database"""
+        from .models import Movie
+
+        try:
+            version = cache.get(VERSION_KEY)
+            rows = Movie.objects.values_list('id', 'name', 'rating_aggregate__total_ratings')
+            movies = {movie_id: (name, popularity or 0) for movie_id, name, popularity in rows.iterator()}
+        except DatabaseError:
+            logger.warning('Could not warm the movie autocomplete index', exc_info=True)
+            return
+
+        keys = sorted(
+            (key, movie_id)
+            for movie_id, (name, _) in movies.items()
+            for key in self.word_keys(name)
+        )
+        with self._lock:
+            self._movies = movies
+            self._keys = keys
+            self._memo = OrderedDict()
+            self._loaded = True
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if not self._loaded:
+            self.warm()
+            return
+        if time.monotonic() - self._checked_at < self.REFRESH_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        if cache.get(VERSION_KEY) != self._version:
+            self.warm()
+        else:
+            with self._lock:
+                self._memo.clear()
+
+    def search(self, prefix, limit=10):
+        """Return up to ``limit`` (movie_id, name) pairs whose title has a word starting with ``prefix``"""
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+        self.ensure_fresh()
+
+        with self._lock:
+            memo_key = (prefix, limit)
+            if memo_key in self._memo:
+                self._memo.move_to_end(memo_key)
+                return self._memo[memo_key]
+
+            start = bisect.bisect_left(self._keys, (prefix,))
+            end = bisect.bisect_left(self._keys, (prefix + '\uffff',), start)
+            movie_ids = {movie_id for _, movie_id in self._keys[start:end]}
+            best = heapq.nsmallest(
+                limit, movie_ids,
+                key=lambda movie_id: (-self._movies[movie_id][1], self._movies[movie_id][0], movie_id)
+            )
+            results = [(movie_id, self._movies[movie_id][0]) for movie_id in best]
+
+            self._memo[memo_key] = results
+            if len(self._memo) > self.MEMO_SIZE:
+                self._memo.popitem(last=False)
+            return results
+
+    def add_movie(self, movie_id, name, popularity=None):
+        """Insert or rename a movie
+
+        Callers only pass new movies and real renames. An index that was
+        never loaded is left to warm on its first search.
+        """
+        with self._lock:
+            if self._loaded:
+                current = self._movies.get(movie_id)
+                if current is not None and current[0] == name:
+                    return
+                if popularity is None:
+                    popularity = current[1] if current else 0
+                self._remove_keys(movie_id)
+                self._movies[movie_id] = (name, popularity)
+                for key in self.word_keys(name):
+                    bisect.insort(self._keys, (key, movie_id))
+                self._memo.clear()
+        self._publish_change()
+
+    def remove_movie(self, movie_id):
+        with self._lock:
+            if self._loaded:
+                self._remove_keys(movie_id)
+                self._movies.pop(movie_id, None)
+                self._memo.clear()
+        self._publish_change()
+
+    def set_popularity(self, movie_id, popularity):
+        with self._lock:
+            if not self._loaded or movie_id not in self._movies:
+                return
+            name = self._movies[movie_id][0]
+            self._movies[movie_id] = (name, popularity)
+
+    def _remove_keys(self, movie_id):
+        if movie_id not in self._movies:
+            return
+        for key in self.word_keys(self._movies[movie_id][0]):
+            position = bisect.bisect_left(self._keys, (key, movie_id))
+            if position < len(self._keys) and self._keys[position] == (key, movie_id):
+                del self._keys[position]
+
+    def _publish_change(self):
+        version = publish_catalog_change()
+        # Only skip the next reload if no other process changed the catalog meanwhile
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+
+
+def publish_catalog_change():
+    """Tell autocomplete indexes in other processes that movie names changed"""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+        return cache.get(VERSION_KEY)
+
+
+movie_name_index = PrefixIndex()
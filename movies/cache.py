@@ -0,0 +1,138 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from django.core.cache import cache
+
+SHOW_PAGE_TIMEOUT = 60 * 60
+SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+CATALOG_CHANGED_KEY = 'movies:catalog:changed_at'
+
+
+def _version_key(scope, movie_id):
+    return f'movies:{scope}:version:{movie_id}'
+
+
+def _new_version():
+    # Seeded from the clock so a version key that was evicted never comes
+    # back with a number that older entries were stored under
+    return time.time_ns()
+
+
+def get_movie_version(movie_id, scope='page'):
+    """Return the current cache version of a movie for the given scope"""
+    key = _version_key(scope, movie_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_movie_versions(movie_ids, scope='page'):
+    """Return {movie_id: version} for many movies with one cache round trip"""
+    keys = {_version_key(scope, movie_id): movie_id for movie_id in movie_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, movie_id in keys.items():
+        if movie_id not in versions:
+            cache.add(key, _new_version(), None)
+            versions[movie_id] = cache.get(key)
+    return versions
+
+
+def invalidate_movie(movie_id, scope='page'):
+    """Bump a movie's cache version so entries built from older data are skipped"""
+    key = _version_key(scope, movie_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def show_page_key(movie_id, after=None):
+    """Cache key for the user-independent parts of a movie's detail page
+
+    ``after`` is the decoded (date, id) review cursor, or None for the
+    first page of reviews.
+    """
+    version = get_movie_version(movie_id)
+    reviews = f'{after[0].astimezone(timezone.utc).isoformat()}:{after[1]}' if after else 'first'
+    return f'movies:show:{movie_id}:v{version}:{reviews}'
+
+
+def touch_catalog():
+    """Record that some movie was added, changed or removed"""
+    cache.set(CATALOG_CHANGED_KEY, time.time(), None)
+
+
+def get_catalog_changed_at():
+    """When the catalog last changed, as an aware datetime.
+
+    Only changes made by processes sharing the cache backend are seen.
+
+    If the marker has been evicted it is reset to now, which only costs
+    clients one full response.
+    """
+    changed_at = cache.get(CATALOG_CHANGED_KEY)
+    if changed_at is None:
+        cache.add(CATALOG_CHANGED_KEY, time.time(), None)
+        changed_at = cache.get(CATALOG_CHANGED_KEY)
+    return datetime.fromtimestamp(changed_at, tz=timezone.utc)
+
+
+def make_etag(*parts):
+    """Build an ETag value from the metadata a response was generated from"""
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def acquire_lock(key, timeout=SINGLE_FLIGHT_LOCK_TIMEOUT):
+    """Take a lock in the cache; return its token, or None if it is held"""
+    token = uuid.uuid4().hex
+    return token if cache.add(key, token, timeout) else None
+
+
+def release_lock(key, token):
+    """Release a lock taken with acquire_lock
+
+    If the holder outlived the timeout, the lock may since have been taken
+    by another worker, and that worker's lock is left alone.
+    """
+    if token is not None and cache.get(key) == token:
+        cache.delete(key)
+
+
+def get_or_compute(key, compute, timeout, wait=5.0):
+    """Return (computed_at, value) from the cache, computing it once across concurrent misses.
+
+    The first caller to miss takes a lock in the cache and runs compute();
+    the others poll for its result instead of repeating the work. If the
+    result does not show up within ``wait`` seconds (the holder crashed or
+    is very slow), a waiter computes it itself.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + wait
+    token = acquire_lock(lock_key)
+    while token is None:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if time.monotonic() >= deadline:
+            break
+        token = acquire_lock(lock_key)
+
+    try:
+        # The previous holder may have stored the value just before we got the lock
+        entry = cache.get(key) if token is not None else None
+        if entry is None:
+            entry = (time.time(), compute())
+            cache.set(key, entry, timeout)
+        return entry
+    finally:
+        release_lock(lock_key, token)
@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes (width, height); posters are scaled down to fit, never up
+VARIANTS = {
+    'thumbnail': (160, 240),
+    'card': (400, 600),
+    'detail': (800, 1200),
+}
+JPEG_QUALITY = 82
+VARIANT_DIR = 'movie_images/variants'
+
+_executor = None
+
+
+def get_executor():
+    """Return the shared process pool used for image work"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=min(len(VARIANTS), os.cpu_count() or 1))
+    return _executor
+
+
+def discard_executor(executor):
+    """Drop a broken pool so the next image gets a fresh one"""
+    global _executor
+    executor.shutdown(wait=False, cancel_futures=True)
+    if _executor is executor:
+        _executor = None
+
+
+def render_variant(source_path, media_root, variant, size):
+    """Resize and recompress one poster variant and return (variant, storage name).
+
+    Runs in a worker process, so it only touches the filesystem. The file
+    name embeds a hash of the encoded bytes, which makes variant URLs safe
+    to cache forever.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.LANCZOS)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    name = f'{VARIANT_DIR}/{stem}.{variant}.{digest}.jpg'
+
+    path = os.path.join(media_root, name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as output:
+            output.write(data)
+        os.replace(temp_path, path)
+    return variant, name
+
+
+def submit_variants(image_name):
+    """Queue every variant of an image on the pool and return the futures
+
+    A pool broken by a crashed worker is replaced once. If the new one
+    breaks too, no futures are returned and the image gets no variants.
+    """
+    source_path = default_storage.path(image_name)
+    for _ in range(2):
+        executor = get_executor()
+        try:
+            return [
+                executor.submit(render_variant, source_path, str(settings.MEDIA_ROOT), variant, size)
+                for variant, size in VARIANTS.items()
+            ]
+        except BrokenProcessPool:
+            logger.warning('Replacing the broken image worker pool', exc_info=True)
+            discard_executor(executor)
+    logger.error('Could not queue image variants for %s', image_name)
+    return []
+
+
+def collect_variants(image_name, futures):
+    """Wait for submitted variants and build the value stored in Movie.image_variants"""
+    from PIL import Image
+
+    if not futures:
+        return {}
+    try:
+        variants = dict(future.result() for future in futures)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('Could not generate image variants for %s', image_name)
+        return {}
+    except BrokenProcessPool:
+        # A worker died, e.g. killed while decoding a huge image. The next
+        # submit_variants call replaces the pool.
+        logger.exception('Image worker pool broke while generating variants for %s', image_name)
+        return {}
+    variants['source'] = image_name
+    return variants
+
+
+def generate_variants(image_name):
+    """Generate all variants of a stored image, or return {} if it is missing or unreadable"""
+    if not image_name or not default_storage.exists(image_name):
+        return {}
+    return collect_variants(image_name, submit_variants(image_name))
+
+
+def generate_variants_later(movie_id, image_name):
+    """Generate a movie's variants after the current transaction commits, without waiting for them
+
+    A background thread waits on the pool and stores the result. Work lost
+    to a restart is picked up by the generate_image_variants command.
+    """
+    def start():
+        threading.Thread(target=store_variants, args=(movie_id, image_name), daemon=True).start()
+    transaction.on_commit(start)
+
+
+def store_variants(movie_id, image_name):
+    from .cache import invalidate_movie, touch_catalog
+    from .models import Movie
+
+    try:
+        variants = generate_variants(image_name)
+        # Skip movies whose image changed again in the meantime
+        if variants and Movie.objects.filter(pk=movie_id, image=image_name).update(image_variants=variants):
+            invalidate_movie(movie_id)
+            invalidate_movie(movie_id, scope='row')
+            touch_catalog()
+    except Exception:
+        logger.exception('Could not store image variants for movie %s', movie_id)
+    finally:
+        connection.close()
@@ -0,0 +1,67 @@
+import random
+import statistics
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from movies.benchmarking import time_calls
+from movies.models import Movie
+from movies.search import MovieSearchEngine
+
+WORDS = [
+    'dark', 'knight', 'galaxy', 'love', 'war', 'return', 'shadow', 'city', 'night', 'storm',
+    'empire', 'dream', 'river', 'ghost', 'secret', 'fire', 'ocean', 'legend', 'winter', 'machine',
+    'heart', 'island', 'kingdom', 'hunter', 'silent', 'journey', 'golden', 'lost', 'wild', 'star',
+]
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'tor', 'vel', 'sa', 'quin', 'dor', 'ash', 'el', 'bri']
+
+QUERIES = ['knight', 'dark knight', 'gal', 'secret ocean', 'legend of the lost', 'zzz']
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text movie search against the icontains scan (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=100000, help='Number of synthetic movies')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        self.vocabulary = WORDS + [
+            ''.join(random.choices(SYLLABLES, k=random.randint(2, 4))) for _ in range(20000)
+        ]
+        with transaction.atomic():
+            self.stdout.write(f"Inserting {options['movies']} synthetic movies...")
+            Movie.objects.bulk_create(
+                (self.make_movie() for _ in range(options['movies'])),
+                batch_size=5000
+            )
+            MovieSearchEngine.rebuild()
+
+            for query in QUERIES:
+                name_scan_ms, _ = time_calls(
+                    lambda: list(Movie.objects.filter(name__icontains=query).values_list('id', flat=True)),
+                    options['repeat'], statistics.median
+                )
+                full_scan_ms, _ = time_calls(
+                    lambda: [movie_id for movie_id, _ in MovieSearchEngine._fallback_search(query)],
+                    options['repeat'], statistics.median
+                )
+                fts_ms, _ = time_calls(
+                    lambda: MovieSearchEngine.search(query, limit=50), options['repeat'], statistics.median
+                )
+                self.stdout.write(
+                    f'{query!r:24} icontains name: {name_scan_ms:8.2f} ms   '
+                    f'icontains name+description: {full_scan_ms:8.2f} ms   fts5 top 50: {fts_ms:8.2f} ms'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; synthetic data rolled back'))
+
+    def make_movie(self):
+        return Movie(
+            name=' '.join([random.choice(WORDS)] + random.choices(self.vocabulary, k=2)).title(),
+            price=random.randint(5, 30),
+            description=' '.join(random.choices(self.vocabulary, k=30)),
+            image='movie_images/benchmark.jpg',
+        )
+
@@ -0,0 +1,53 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from movies.cache import invalidate_movie, touch_catalog
+from movies.images import collect_variants, submit_variants
+from movies.models import Movie
+
+class Command(BaseCommand):
+    help = 'Generate resized poster variants for existing movie images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that are already up to date')
+        parser.add_argument('--batch-size', type=int, default=100, help='Movies queued on the process pool at once')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Generating image variants...')
+
+        movies = Movie.objects.exclude(image='').only('id', 'image', 'image_variants').order_by('id')
+        generated_count = 0
+        skipped_count = 0
+        batch = []
+
+        for movie in movies.iterator(chunk_size=options['batch_size']):
+            is_current = (movie.image_variants or {}).get('source') == movie.image.name
+            if (is_current and not options['force']) or not default_storage.exists(movie.image.name):
+                skipped_count += 1
+                continue
+            # Queue the whole batch before waiting so the pool stays busy
+            batch.append((movie, submit_variants(movie.image.name)))
+            if len(batch) >= options['batch_size']:
+                generated_count += self.save_batch(batch)
+                batch = []
+
+        if batch:
+            generated_count += self.save_batch(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated variants for {generated_count} movies ({skipped_count} skipped)')
+        )
+
+    def save_batch(self, batch):
+        updated = []
+        for movie, futures in batch:
+            variants = collect_variants(movie.image.name, futures)
+            if variants:
+                movie.image_variants = variants
+                updated.append(movie)
+
+        Movie.objects.bulk_update(updated, ['image_variants'])
+        for movie in updated:
+            invalidate_movie(movie.id)
+            invalidate_movie(movie.id, scope='row')
+        touch_catalog()
+        return len(updated)
@@ -0,0 +1,230 @@
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from movies.autocomplete import publish_catalog_change
+from movies.cache import invalidate_movie, touch_catalog
+from movies.images import collect_variants, submit_variants
+from movies.models import Movie
+from movies.search import MovieSearchEngine
+from ratings.models import RatingAggregate
+
+MOVIE_FIELDS = ['name', 'price', 'description', 'image']
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_rows(stream, file_format):
+    """Yield raw rows from a CSV or JSON Lines stream, one at a time
+
+    CSV rows are dicts. JSON Lines rows are yielded as undecoded lines so
+    that parse_row can reject a bad line without ending the stream.
+    """
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def text_value(row, field):
+    """A text field of a raw row, '' when missing"""
+    value = row.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise InvalidRow(f'{field} must be a string')
+    return value
+
+
+def parse_row(row):
+    """Normalize one raw row into the values stored on a Movie"""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise InvalidRow(f'invalid JSON: {e}')
+    if not isinstance(row, dict):
+        raise InvalidRow('row must be an object')
+    name = text_value(row, 'name').strip()
+    if not name:
+        raise InvalidRow('name is required')
+    try:
+        price = int(row.get('price'))
+    except (TypeError, ValueError):
+        raise InvalidRow(f'invalid price {row.get("price")!r}')
+    movie_id = row.get('id')
+    try:
+        movie_id = int(movie_id) if movie_id not in (None, '') else None
+    except (TypeError, ValueError):
+        raise InvalidRow(f'invalid id {movie_id!r}')
+    return {
+        'id': movie_id,
+        'name': name,
+        'price': price,
+        'description': text_value(row, 'description'),
+        'image': text_value(row, 'image').strip(),
+    }
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def dedupe_ids(batch):
+    """Drop all but the last row for each id repeated within a batch"""
+    last_index = {row['id']: index for index, row in enumerate(batch) if row['id'] is not None}
+    return [
+        row for index, row in enumerate(batch)
+        if row['id'] is None or last_index[row['id']] == index
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Stream movies from a CSV or JSON Lines file into the catalog in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import, or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per transaction')
+        parser.add_argument('--images-dir', help='Directory holding the image files named in the rows')
+        parser.add_argument('--workers', type=int, default=8, help='Threads used to copy images')
+        parser.add_argument('--skip-variants', action='store_true', help='Do not generate resized image variants')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'jsonl')
+        self.images_dir = options['images_dir']
+        self.skip_variants = options['skip_variants']
+        self.invalid_count = 0
+
+        if options['path'] == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        else:
+            try:
+                stream = open(options['path'], newline='', encoding='utf-8')
+            except OSError as e:
+                raise CommandError(f'Cannot open {options["path"]}: {e}')
+
+        self.stdout.write(f'Importing movies from {options["path"]}...')
+        created_count = 0
+        updated_count = 0
+        start = time.perf_counter()
+
+        with stream, ThreadPoolExecutor(max_workers=options['workers']) as image_pool:
+            self.image_pool = image_pool
+            for batch in batched(self.valid_rows(read_rows(stream, file_format)), options['batch_size']):
+                created, updated = self.import_batch(batch)
+                created_count += created
+                updated_count += updated
+
+                processed = created_count + updated_count
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'  {processed} rows imported ({processed / elapsed:.0f} rows/s)')
+
+        elapsed = time.perf_counter() - start
+        processed = created_count + updated_count
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {processed} movies ({created_count} created, {updated_count} updated, '
+                f'{self.invalid_count} invalid rows skipped) in {elapsed:.1f}s '
+                f'({processed / max(elapsed, 1e-9):.0f} rows/s)'
+            )
+        )
+
+    def valid_rows(self, rows):
+        for line_number, row in enumerate(rows, start=1):
+            try:
+                yield parse_row(row)
+            except InvalidRow as e:
+                self.invalid_count += 1
+                self.stderr.write(f'Skipping row {line_number}: {e}')
+
+    def import_batch(self, batch):
+        batch = dedupe_ids(batch)
+        images = list(self.image_pool.map(self.store_image, [row['image'] for row in batch]))
+
+        with transaction.atomic():
+            existing = Movie.objects.only('id', 'image_variants', *MOVIE_FIELDS).in_bulk(
+                [row['id'] for row in batch if row['id'] is not None]
+            )
+            to_create = []
+            to_update = []
+            for row, image in zip(batch, images):
+                movie = existing.get(row['id'])
+                if movie is None:
+                    movie = Movie(id=row['id'])
+                    to_create.append(movie)
+                else:
+                    to_update.append(movie)
+                movie.name = row['name']
+                movie.price = row['price']
+                movie.description = row['description']
+                movie.image = image
+
+            Movie.objects.bulk_create(to_create)
+            Movie.objects.bulk_update(to_update, MOVIE_FIELDS)
+            RatingAggregate.objects.bulk_create(
+                [RatingAggregate(movie_id=movie.id) for movie in to_create],
+                ignore_conflicts=True
+            )
+            # Bulk writes skip model signals, so refresh what they maintain
+            MovieSearchEngine.index_movies(to_create + to_update)
+
+        for movie in to_update:
+            invalidate_movie(movie.id)
+            invalidate_movie(movie.id, scope='row')
+        touch_catalog()
+        publish_catalog_change()
+        if not self.skip_variants:
+            self.generate_variants(to_create + to_update)
+        return len(to_create), len(to_update)
+
+    def store_image(self, image):
+        """Copy an image from --images-dir into media storage and return its storage name"""
+        if not image or not self.images_dir:
+            return image
+        name = f'movie_images/{os.path.basename(image)}'
+        if not default_storage.exists(name):
+            source_path = os.path.join(self.images_dir, image)
+            if not os.path.exists(source_path):
+                self.stderr.write(f'Image not found: {source_path}')
+                return ''
+            with open(source_path, 'rb') as source:
+                name = default_storage.save(name, File(source))
+        return name
+
+    def generate_variants(self, movies):
+        pending = [
+            (movie, submit_variants(movie.image.name))
+            for movie in movies
+            if movie.image and (movie.image_variants or {}).get('source') != movie.image.name
+            and default_storage.exists(movie.image.name)
+        ]
+        updated = []
+        for movie, futures in pending:
+            variants = collect_variants(movie.image.name, futures)
+            if variants:
+                movie.image_variants = variants
+                updated.append(movie)
+        Movie.objects.bulk_update(updated, ['image_variants'])
+        for movie in updated:
+            invalidate_movie(movie.id)
+            invalidate_movie(movie.id, scope='row')
+        touch_catalog()
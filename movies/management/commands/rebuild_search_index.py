@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from movies.search import MovieSearchEngine
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for movies'
+
+    def handle(self, *args, **options):
+        if not MovieSearchEngine.is_available():
+            self.stdout.write('Full-text search index is only available on SQLite; nothing to rebuild.')
+            return
+
+        self.stdout.write('Rebuilding movie search index...')
+        indexed_count = MovieSearchEngine.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully indexed {indexed_count} movies')
+        )
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS movies_movie_fts USING fts5("
+        "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    schema_editor.execute(
+        "INSERT INTO movies_movie_fts (rowid, name, description) "
+        "SELECT id, name, description FROM movies_movie"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS movies_movie_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_review'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_movie_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', 'date'], name='movies_revi_movie_i_da0729_idx'),
+        ),
+    ]
@@ -1,5 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.functions import Coalesce
+
+class MovieQuerySet(models.QuerySet):
+    def with_rating_stats(self):
+        """Annotate each movie with its aggregate rating stats in the same query"""
+        return self.annotate(
+            avg_rating=Coalesce(models.F('rating_aggregate__average_rating'), models.Value(0.0)),
+            num_ratings=Coalesce(models.F('rating_aggregate__total_ratings'), models.Value(0)),
+        )
 
 class Movie(models.Model):
     id = models.AutoField(primary_key=True)
@@ -7,12 +16,38 @@ class Movie(models.Model):
     price = models.IntegerField()
     description = models.TextField()
     image = models.ImageField(upload_to='movie_images/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = MovieQuerySet.as_manager()
 
     def __str__(self):
         return str(self.id) + ' - ' + self.name
     
+    def get_image_url(self, variant):
+        """Get the URL of a resized poster variant, falling back to the original"""
+        if not self.image:
+            return None
+        variants = self.image_variants or {}
+        if variant in variants and variants.get('source') == self.image.name:
+            return self.image.storage.url(variants[variant])
+        return self.image.url
+
+    @property
+    def thumbnail_url(self):
+        return self.get_image_url('thumbnail')
+
+    @property
+    def card_url(self):
+        return self.get_image_url('card')
+
+    @property
+    def detail_url(self):
+        return self.get_image_url('detail')
+
     def get_average_rating(self):
         """Get the average rating for this movie"""
+        if 'avg_rating' in self.__dict__:
+            return self.avg_rating
         try:
             from ratings.models import RatingAggregate
             aggregate = RatingAggregate.objects.get(movie=self)
@@ -22,6 +57,8 @@ class Movie(models.Model):
     
     def get_rating_count(self):
         """Get the total number of ratings for this movie"""
+        if 'num_ratings' in self.__dict__:
+            return self.num_ratings
         try:
             from ratings.models import RatingAggregate
             aggregate = RatingAggregate.objects.get(movie=self)
@@ -49,5 +86,10 @@ class Review(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['movie', 'date']),
+        ]
+
     def __str__(self):
         return str(self.id) + ' - ' + self.movie.name
\ No newline at end of file
@@ -0,0 +1,52 @@
+import base64
+import json
+import math
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    payload = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _check_type(value, expected):
+    """Return value as the expected type, or raise InvalidCursor"""
+    # bool is a subclass of int but never a valid sort key
+    if isinstance(value, bool):
+        raise InvalidCursor('Malformed cursor')
+    if expected is float and isinstance(value, (int, float)) and math.isfinite(value):
+        return float(value)
+    if expected is not float and isinstance(value, expected):
+        return value
+    raise InvalidCursor('Malformed cursor')
+
+
+def decode_cursor(cursor, length, types=None):
+    """Decode a cursor produced by encode_cursor into a list of ``length`` values
+
+    Cursors come from the client, so with ``types`` each value is also
+    checked against the matching type (int, float or str).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor('Malformed cursor')
+    if types is not None:
+        values = [_check_type(value, expected) for value, expected in zip(values, types)]
+    return values
+
+
+def get_page_size(value, default, maximum):
+    """Parse a requested page size, falling back to the default and capping it"""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
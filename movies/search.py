@@ -0,0 +1,133 @@
+import re
+from django.db import connection
+from django.db.models import Q
+
+FTS_TABLE = 'movies_movie_fts'
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class MovieSearchEngine:
+    """Ranked full-text search over movie names and descriptions.
+
+    On SQLite the index is an FTS5 table keyed by movie id (see migration
+    0003_movie_search_index). Other database backends fall back to an
+    icontains scan so the catalog search keeps working everywhere.
+    """
+
+    # bm25 column weights: a hit in the title outranks one in the description
+    NAME_WEIGHT = 10.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    @staticmethod
+    def is_available():
+        """Whether the FTS5 index can be used on the current database"""
+        return connection.vendor == 'sqlite'
+
+    @staticmethod
+    def tokenize(search_term):
+        """Split a free-text query into lowercase search terms"""
+        return TOKEN_PATTERN.findall((search_term or '').lower())
+
+    @classmethod
+    def build_match_expression(cls, search_term):
+        """Build an FTS5 MATCH expression where every term is a prefix match.
+
+        Terms are quoted so user input can never inject FTS5 query syntax,
+        and are implicitly AND-ed together.
+        """
+        return ' '.join(f'"{token}"*' for token in cls.tokenize(search_term))
+
+    @classmethod
+    def search(cls, search_term, limit=None, after=None):
+        """Return a list of (movie_id, score) pairs, best match first.
+
+        Lower scores are better, as with SQLite's bm25(). Pass the last
+        (score, movie_id) pair of a previous page as ``after`` to continue
+        from it (keyset pagination).
+        """
+        match = cls.build_match_expression(search_term)
+        if not match:
+            return []
+
+        if not cls.is_available():
+            return cls._fallback_search(search_term, limit, after)
+
+        sql = (
+            f'SELECT movie_id, score FROM ('
+            f'SELECT rowid AS movie_id, bm25({FTS_TABLE}, %s, %s) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [cls.NAME_WEIGHT, cls.DESCRIPTION_WEIGHT, match]
+        if after is not None:
+            after_score, after_id = after
+            sql += ' WHERE score > %s OR (score = %s AND movie_id > %s)'
+            params += [after_score, after_score, after_id]
+        sql += ' ORDER BY score, movie_id'
+        if limit is not None:
+            sql += ' LIMIT %s'
+            params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+    @classmethod
+    def _fallback_search(cls, search_term, limit=None, after=None):
+        from .models import Movie
+
+        query = Q()
+        for token in cls.tokenize(search_term):
+            query &= Q(name__icontains=token) | Q(description__icontains=token)
+        if after is not None:
+            query &= Q(id__gt=after[1])
+
+        movie_ids = Movie.objects.filter(query).order_by('id').values_list('id', flat=True)
+        if limit is not None:
+            movie_ids = movie_ids[:limit]
+        return [(movie_id, 0.0) for movie_id in movie_ids]
+
+    @classmethod
+    def index_movies(cls, movies):
+        """Add or refresh the index entries for the given movies"""
+        if not cls.is_available():
+            return
+        rows = [(movie.id, movie.name, movie.description) for movie in movies]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)',
+                rows
+            )
+
+    @classmethod
+    def index_movie(cls, movie):
+        """Add or refresh the index entry for a single movie"""
+        cls.index_movies([movie])
+
+    @classmethod
+    def remove_movie(cls, movie_id):
+        """Drop a movie from the index"""
+        if not cls.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [movie_id])
+
+    @classmethod
+    def rebuild(cls):
+        """Rebuild the whole index from the movies table and return its size"""
+        if not cls.is_available():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+                f'SELECT id, name, description FROM movies_movie'
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
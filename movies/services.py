@@ -0,0 +1,197 @@
+import pickle
+import threading
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from .cache import get_movie_versions
+from .models import Movie, Review
+from .pagination import InvalidCursor, encode_cursor, decode_cursor
+from .search import MovieSearchEngine
+
+
+class CatalogService:
+    """Service class for paging through the movie catalog"""
+
+    DEFAULT_PAGE_SIZE = 24
+    MAX_PAGE_SIZE = 100
+
+    @staticmethod
+    def get_page(search_term=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """Return (movies, next_cursor) for one catalog page.
+
+        Browsing is ordered by id and searching by relevance then id. Both
+        continue from the cursor with a keyset condition rather than an
+        OFFSET, so deep pages are as cheap to fetch as the first one.
+        Raises InvalidCursor for cursors that cannot be decoded.
+        """
+        from ratings.services import RatingWriteBuffer
+        RatingWriteBuffer.ensure_fresh()
+        if search_term:
+            return CatalogService._get_search_page(search_term, cursor, page_size)
+
+        movies = Movie.objects.with_rating_stats().order_by('id')
+        if cursor:
+            last_id, = decode_cursor(cursor, 1, types=(int,))
+            movies = movies.filter(id__gt=last_id)
+
+        movies = list(movies[:page_size + 1])
+        next_cursor = None
+        if len(movies) > page_size:
+            movies = movies[:page_size]
+            next_cursor = encode_cursor([movies[-1].id])
+        return movies, next_cursor
+
+    @staticmethod
+    def _get_search_page(search_term, cursor, page_size):
+        after = decode_cursor(cursor, 2, types=(float, int)) if cursor else None
+        results = MovieSearchEngine.search(search_term, limit=page_size + 1, after=after)
+
+        next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            last_id, last_score = results[-1]
+            next_cursor = encode_cursor([last_score, last_id])
+
+        positions = {movie_id: position for position, (movie_id, _) in enumerate(results)}
+        movies = Movie.objects.with_rating_stats().filter(id__in=positions)
+        return sorted(movies, key=lambda movie: positions[movie.id]), next_cursor
+
+
+class ReviewService:
+    """Service class for paging through a movie's reviews"""
+
+    PAGE_SIZE = 20
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """Decode a review cursor into the (date, id) of the last review shown
+        
+        Raises InvalidCursor unless it holds a timezone-aware ISO date and
+        an int id.
+        """
+        last_date, last_id = decode_cursor(cursor, 2, types=(str, int))
+        try:
+            last_date = parse_datetime(last_date)
+        except ValueError:
+            last_date = None
+        if last_date is None or last_date.tzinfo is None:
+            raise InvalidCursor('Malformed cursor')
+        return last_date, last_id
+
+    @staticmethod
+    def get_page(movie, after=None, page_size=PAGE_SIZE):
+        """Return (reviews, next_cursor) for one page of reviews, newest first.
+
+        Authors are joined in the same query, and older pages continue from
+        the (date, id) given as ``after``, as returned by parse_cursor. The
+        (movie, date) index serves each page as a range scan.
+        """
+        reviews = Review.objects.filter(movie=movie).select_related('user').order_by('-date', '-id')
+        if after is not None:
+            last_date, last_id = after
+            reviews = reviews.filter(Q(date__lt=last_date) | Q(date=last_date, id__lt=last_id))
+
+        reviews = list(reviews[:page_size + 1])
+        next_cursor = None
+        if len(reviews) > page_size:
+            reviews = reviews[:page_size]
+            next_cursor = encode_cursor([reviews[-1].date.isoformat(), reviews[-1].id])
+        return reviews, next_cursor
+
+
+class MovieLookupService:
+    """Read-through cache for Movie rows shared by every app.
+
+    Lookups go through a per-process LRU, then the Django cache, then the
+    database. Entries are stored under the movie's 'row' cache version, and
+    saving or deleting a movie bumps that version, so stale copies are
+    skipped in every process that shares the cache backend (see CACHES;
+    with LocMemCache that is only the current one). The LRU holds pickled
+    rows, so every caller gets its own instances.
+    """
+
+    LOCAL_CACHE_SIZE = 1024
+    TIMEOUT = 60 * 60
+
+    _local = OrderedDict()
+    _lock = threading.Lock()
+    _stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def _shared_key(movie_id, version):
+        return f'movies:row:{movie_id}:v{version}'
+
+    @classmethod
+    def get(cls, movie_id):
+        """Return the movie with the given id, or None if it does not exist"""
+        return cls.get_many([movie_id]).get(int(movie_id))
+
+    @classmethod
+    def get_or_404(cls, movie_id):
+        movie = cls.get(movie_id)
+        if movie is None:
+            raise Http404('No Movie matches the given query.')
+        return movie
+
+    @classmethod
+    def get_many(cls, movie_ids):
+        """Return {movie_id: movie} for the ids that exist"""
+        movie_ids = {int(movie_id) for movie_id in movie_ids}
+        if not movie_ids:
+            return {}
+        versions = get_movie_versions(movie_ids, scope='row')
+
+        movies = {}
+        with cls._lock:
+            for movie_id in movie_ids:
+                entry = cls._local.get(movie_id)
+                if entry is not None and entry[0] == versions[movie_id]:
+                    cls._local.move_to_end(movie_id)
+                    movies[movie_id] = pickle.loads(entry[1])
+            cls._stats['local_hits'] += len(movies)
+
+        missing = movie_ids - movies.keys()
+        if missing:
+            keys = {cls._shared_key(movie_id, versions[movie_id]): movie_id for movie_id in missing}
+            shared = {keys[key]: movie for key, movie in cache.get_many(keys).items()}
+            movies.update(shared)
+            cls._stats['shared_hits'] += len(shared)
+
+            missing -= shared.keys()
+            loaded = Movie.objects.in_bulk(missing) if missing else {}
+            cls._stats['misses'] += len(missing)
+            cache.set_many(
+                {cls._shared_key(movie_id, versions[movie_id]): movie for movie_id, movie in loaded.items()},
+                cls.TIMEOUT
+            )
+            movies.update(loaded)
+            cls._remember({movie_id: movies[movie_id] for movie_id in shared.keys() | loaded.keys()}, versions)
+
+        return movies
+
+    @classmethod
+    def _remember(cls, movies, versions):
+        with cls._lock:
+            for movie_id, movie in movies.items():
+                cls._local[movie_id] = (versions[movie_id], pickle.dumps(movie))
+                cls._local.move_to_end(movie_id)
+            while len(cls._local) > cls.LOCAL_CACHE_SIZE:
+                cls._local.popitem(last=False)
+
+    @classmethod
+    def forget(cls, movie_id):
+        """Drop a movie from this process's LRU (other processes see the version bump)"""
+        with cls._lock:
+            cls._local.pop(movie_id, None)
+
+    @classmethod
+    def stats(cls):
+        """Hit/miss counters for this process"""
+        with cls._lock:
+            stats = dict(cls._stats)
+            stats['local_size'] = len(cls._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,77 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from .autocomplete import movie_name_index
+from .cache import invalidate_movie, touch_catalog
+from .images import generate_variants_later
+from .models import Movie, Review
+from .search import MovieSearchEngine
+from .services import MovieLookupService
+
+SEARCH_FIELDS = {'name', 'description'}
+
+
+@receiver(post_save, sender=Movie)
+def index_saved_movie(sender, instance, update_fields=None, **kwargs):
+    """Keep the search index in sync with movie edits"""
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    MovieSearchEngine.index_movie(instance)
+
+
+@receiver(post_delete, sender=Movie)
+def unindex_deleted_movie(sender, instance, **kwargs):
+    MovieSearchEngine.remove_movie(instance.id)
+
+
+@receiver(post_save, sender=Movie)
+def generate_movie_image_variants(sender, instance, raw=False, **kwargs):
+    """Build resized poster variants in the background when a movie gets a new image"""
+    if raw or not instance.image:
+        return
+    if (instance.image_variants or {}).get('source') == instance.image.name:
+        return
+    generate_variants_later(instance.pk, instance.image.name)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_movie_page(sender, instance, **kwargs):
+    invalidate_movie(instance.id)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_movie_row(sender, instance, **kwargs):
+    invalidate_movie(instance.id, scope='row')
+    MovieLookupService.forget(instance.id)
+    touch_catalog()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviewed_movie_page(sender, instance, **kwargs):
+    invalidate_movie(instance.movie_id)
+
+
+@receiver(pre_save, sender=Movie)
+def note_movie_rename(sender, instance, update_fields=None, **kwargs):
+    """Remember whether a save changes the movie's name, for the autocomplete index"""
+    if update_fields is not None and 'name' not in update_fields:
+        instance._name_changed = False
+    elif instance.pk is None:
+        instance._name_changed = True
+    else:
+        previous = Movie.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        instance._name_changed = previous != instance.name
+
+
+@receiver(post_save, sender=Movie)
+def update_autocomplete_index(sender, instance, **kwargs):
+    # Other processes re-warm their whole index on every published change
+    if getattr(instance, '_name_changed', True):
+        movie_name_index.add_movie(instance.id, instance.name)
+
+
+@receiver(post_delete, sender=Movie)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    movie_name_index.remove_movie(instance.id)
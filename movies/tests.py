@@ -1,3 +1,46 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import Movie
 
-# Create your tests here.
+
+class MovieIndexQueryCountTests(TestCase):
+    """The catalog listing must not issue per-movie rating queries"""
+
+    def create_movies(self, count):
+        from ratings.models import RatingAggregate
+        start = Movie.objects.count()
+        for i in range(start, start + count):
+            movie = Movie.objects.create(
+                name=f'Movie {i}',
+                price=10,
+                description='A movie',
+                image='movie_images/test.jpg',
+            )
+            if i % 2 == 0:
+                RatingAggregate.objects.create(movie=movie, average_rating=4.5, total_ratings=2)
+
+    def count_index_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('movies.index'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_catalog_size(self):
+        self.create_movies(2)
+        small_catalog_queries = self.count_index_queries()
+
+        self.create_movies(10)
+        large_catalog_queries = self.count_index_queries()
+
+        self.assertEqual(small_catalog_queries, large_catalog_queries)
+
+    def test_index_shows_annotated_rating_stats(self):
+        self.create_movies(2)
+        response = self.client.get(reverse('movies.index'))
+        movies = {movie.name: movie for movie in response.context['template_data']['movies']}
+        self.assertEqual(movies['Movie 0'].avg_rating, 4.5)
+        self.assertEqual(movies['Movie 0'].num_ratings, 2)
+        self.assertEqual(movies['Movie 1'].avg_rating, 0.0)
+        self.assertEqual(movies['Movie 1'].num_ratings, 0)
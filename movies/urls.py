@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='movies.index'),
+    path('api/catalog/', views.catalog_api, name='movies.catalog_api'),
+    path('api/autocomplete/', views.autocomplete_api, name='movies.autocomplete_api'),
+    path('api/lookup-stats/', views.lookup_stats_api, name='movies.lookup_stats_api'),
     path('<int:id>/', views.show, name='movies.show'),
     path('<int:id>/review/create/', views.create_review, name='movies.create_review'),
     path('<int:id>/review/<int:review_id>/edit/', views.edit_review, name='movies.edit_review'),
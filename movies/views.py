@@ -1,45 +1,181 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+from .autocomplete import movie_name_index
+from .cache import SHOW_PAGE_TIMEOUT, get_catalog_changed_at, make_etag, show_page_key
 from .models import Movie, Review
+from .pagination import InvalidCursor, get_page_size
+from .services import CatalogService, MovieLookupService, ReviewService
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 
+def catalog_metadata(request):
+    """When the catalog data behind a listing last changed.
+
+    One indexed MAX() over RatingAggregate.last_updated plus the catalog
+    change marker from the cache; memoized on the request so the ETag and
+    Last-Modified checks share it.
+    """
+    if not hasattr(request, '_catalog_last_modified'):
+        from ratings.models import RatingAggregate
+        from ratings.services import RatingWriteBuffer
+        # Apply stale write-behind changes before they are validated against
+        RatingWriteBuffer.ensure_fresh()
+        ratings_updated = RatingAggregate.objects.aggregate(updated=Max('last_updated'))['updated']
+        changed_at = get_catalog_changed_at()
+        request._catalog_last_modified = max(filter(None, [changed_at, ratings_updated]))
+    return request._catalog_last_modified
+
+def catalog_etag(request, *args, **kwargs):
+    return make_etag('catalog', catalog_metadata(request).timestamp(), request.get_full_path())
+
+def catalog_page_etag(request, *args, **kwargs):
+    # The rendered page also shows who is logged in
+    return make_etag(catalog_etag(request), request.user.pk)
+
+def catalog_last_modified(request, *args, **kwargs):
+    return catalog_metadata(request)
+
+@vary_on_cookie
+@condition(etag_func=catalog_page_etag, last_modified_func=catalog_last_modified)
 def index(request):
     search_term = request.GET.get('search')
-    if search_term:
-        movies = Movie.objects.filter(name__icontains=search_term)
-    else:
-        movies = Movie.objects.all()
+    cursor = request.GET.get('cursor')
+    try:
+        movies, next_cursor = CatalogService.get_page(search_term, cursor)
+    except InvalidCursor:
+        cursor = None
+        movies, next_cursor = CatalogService.get_page(search_term)
 
     template_data = {}
     template_data['title'] = 'Movies'
     template_data['movies'] = movies
+    template_data['search_query'] = search_term
+    template_data['is_first_page'] = not cursor
+    if search_term:
+        template_data['first_page_query'] = urlencode({'search': search_term})
+    if next_cursor:
+        next_query = {'cursor': next_cursor}
+        if search_term:
+            next_query['search'] = search_term
+        template_data['next_page_query'] = urlencode(next_query)
     return render(request, 'movies/index.html', {'template_data': template_data})
 
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+def catalog_api(request):
+    """API endpoint to page through the catalog with a keyset cursor"""
+    page_size = get_page_size(
+        request.GET.get('limit'), CatalogService.DEFAULT_PAGE_SIZE, CatalogService.MAX_PAGE_SIZE
+    )
+    try:
+        movies, next_cursor = CatalogService.get_page(
+            request.GET.get('search'), request.GET.get('cursor'), page_size
+        )
+    except InvalidCursor:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'data': [
+            {
+                'id': movie.id,
+                'name': movie.name,
+                'price': movie.price,
+                'image': movie.card_url,
+                'average_rating': movie.avg_rating,
+                'total_ratings': movie.num_ratings
+            }
+            for movie in movies
+        ],
+        'next': next_cursor
+    })
+
+def autocomplete_api(request):
+    """API endpoint for search-box suggestions, served from the in-memory name index"""
+    limit = get_page_size(request.GET.get('limit'), 10, 20)
+    suggestions = movie_name_index.search(request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'success': True,
+        'data': [{'id': movie_id, 'name': name} for movie_id, name in suggestions]
+    })
+
+@staff_member_required
+def lookup_stats_api(request):
+    """API endpoint exposing this process's movie lookup cache counters"""
+    return JsonResponse({
+        'success': True,
+        'data': MovieLookupService.stats()
+    })
+
 def show(request, id):
-    movie = Movie.objects.get(id=id)
-    reviews = Review.objects.filter(movie=movie)
-    
-    # Get rating information
-    rating_stats = movie.get_rating_stats()
+    review_cursor = request.GET.get('reviews')
+    try:
+        page = get_show_page(id, review_cursor)
+    except InvalidCursor:
+        review_cursor = None
+        page = get_show_page(id)
+
+    # Only the per-user fragment is rebuilt on every request
     user_rating = None
+    user_reviews = []
     if request.user.is_authenticated:
         try:
             from ratings.services import RatingService
-            user_rating = RatingService.get_user_rating(request.user, movie)
+            user_rating = RatingService.get_user_rating(request.user, id)
         except:
             pass
+        user_reviews = Review.objects.filter(movie_id=id, user=request.user).order_by('-date')
 
     template_data = {}
-    template_data['title'] = movie.name
-    template_data['movie'] = movie
-    template_data['reviews'] = reviews
-    template_data['rating_stats'] = rating_stats
+    template_data['title'] = page['title']
+    template_data['movie_id'] = id
+    template_data['page'] = page
+    template_data['is_first_review_page'] = not review_cursor
     template_data['user_rating'] = user_rating
+    template_data['user_reviews'] = user_reviews
     return render(request, 'movies/show.html', {'template_data': template_data})
 
+def get_show_page(movie_id, review_cursor=None):
+    """Return the rendered user-independent parts of a movie's detail page.
+
+    The result is cached under the movie's page version, which is bumped by
+    signal handlers whenever the movie, its reviews or its ratings change.
+    Raises InvalidCursor before touching the cache if the cursor is bad.
+    """
+    after = ReviewService.parse_cursor(review_cursor) if review_cursor else None
+    key = show_page_key(movie_id, after)
+    page = cache.get(key)
+    if page is None:
+        movie = MovieLookupService.get_or_404(movie_id)
+        reviews, next_review_cursor = ReviewService.get_page(movie, after)
+        rating_stats = movie.get_rating_stats()
+        page = {
+            'title': movie.name,
+            'image_url': movie.detail_url or '',
+            'summary_html': render_to_string('movies/show_summary.html', {
+                'movie': movie,
+                'rating_stats': rating_stats,
+            }),
+            'reviews_html': render_to_string('movies/show_reviews.html', {
+                'reviews': reviews,
+            }),
+            'next_review_cursor': next_review_cursor,
+        }
+        cache.set(key, page, SHOW_PAGE_TIMEOUT)
+    return page
+
 @login_required
 def create_review(request, id):
     if request.method == 'POST' and request.POST['comment'] != '':
-        movie = Movie.objects.get(id=id)
+        movie = MovieLookupService.get_or_404(id)
         review = Review()
         review.comment = request.POST['comment']
         review.movie = movie
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviesstore.settings')
 
 application = get_asgi_application()
+
+# Load the in-memory typeahead index before the first request arrives
+from movies.autocomplete import movie_name_index
+
+movie_name_index.warm()
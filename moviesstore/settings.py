@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'petitions',
     'geographic',
     'ratings',
+    'recommendations',
 ]
 
 MIDDLEWARE = [
@@ -89,6 +90,55 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Cache versions (movie rows and pages, the catalog change marker, the
+# autocomplete version) live here. LocMemCache is private to each process,
+# so invalidation only reaches other workers with a shared backend such as
+# Redis or Memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'moviesstore',
+    }
+}
+
+
+# Rating aggregates
+# With write-behind enabled, rating writes queue their aggregate deltas and
+# the flush_rating_buffer worker applies them in batches. Readers see stats
+# at most MAX_STALENESS seconds old; users always see their own writes.
+
+RATINGS_WRITE_BEHIND = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL': 2,
+    'MAX_STALENESS': 10,
+}
+
+# Top-rated movies rank by a damped average: PRIOR_WEIGHT virtual ratings
+# of PRIOR_MEAN are mixed in, so one 5-star vote cannot top the chart.
+# The first SIZE entries of each leaderboard are cached.
+
+RATINGS_LEADERBOARD = {
+    'PRIOR_MEAN': 3.0,
+    'PRIOR_WEIGHT': 10,
+    'SIZE': 100,
+}
+
+# Regional trending ranks movies by a purchase score that halves every
+# HALF_LIFE_HOURS. Changing it requires manage.py rebuild_trending_scores.
+# The trending map serves a snapshot that manage.py trending_worker
+# refreshes every REFRESH_INTERVAL seconds; the newest SNAPSHOTS_KEPT
+# generations are kept.
+
+GEOGRAPHIC_TRENDING = {
+    'HALF_LIFE_HOURS': 48,
+    'REFRESH_INTERVAL': 300,
+    'SNAPSHOTS_KEPT': 3,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -28,6 +28,7 @@ urlpatterns = [
     path('petitions/', include('petitions.urls')),
     path('geographic/', include('geographic.urls')),
     path('ratings/', include('ratings.urls')),
+    path('recommendations/', include('recommendations.urls')),
 ]
 
 urlpatterns += static(settings.MEDIA_URL,
@@ -0,0 +1,202 @@
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from movies.cache import acquire_lock, release_lock
+from .models import RatingAggregate
+
+# Each board lists movies with at least one rating, best first. sort_key
+# mirrors the ORDER BY so cached entries can be re-ranked without a query.
+BOARDS = {
+    'top_rated': {
+        'ordering': ['-bayesian_score', '-total_ratings', 'movie_id'],
+        'sort_key': lambda entry: (-entry['bayesian_score'], -entry['total_ratings'], entry['id']),
+    },
+    'most_rated': {
+        'ordering': ['-total_ratings', '-average_rating', 'movie_id'],
+        'sort_key': lambda entry: (-entry['total_ratings'], -entry['average_rating'], entry['id']),
+    },
+}
+# Upper bound on how long an entry can lag behind a change this process
+# did not see, e.g. one made by another worker with a per-process cache
+LEADERBOARD_TIMEOUT = 5 * 60
+# How long a board update may hold the board's lock, and how long another
+# update waits for it before dropping the board instead
+LEADERBOARD_LOCK_TIMEOUT = 5
+LEADERBOARD_LOCK_POLL_INTERVAL = 0.01
+
+_bulk = threading.local()
+
+
+def _cache_key(board):
+    return f'ratings:leaderboard:{board}'
+
+
+@contextmanager
+def _board_lock(board):
+    """Hold the lock on one cached board; yields False if it could not be taken in time"""
+    lock_key = f'{_cache_key(board)}:lock'
+    deadline = time.monotonic() + LEADERBOARD_LOCK_TIMEOUT
+    token = acquire_lock(lock_key, LEADERBOARD_LOCK_TIMEOUT)
+    while token is None and time.monotonic() < deadline:
+        time.sleep(LEADERBOARD_LOCK_POLL_INTERVAL)
+        token = acquire_lock(lock_key, LEADERBOARD_LOCK_TIMEOUT)
+    try:
+        yield token is not None
+    finally:
+        release_lock(lock_key, token)
+
+
+class RatingLeaderboard:
+    """Cached top-N lists of rated movies, kept current one aggregate at a time
+
+    The first SIZE entries of each board are built with a single indexed
+    query and cached. When an aggregate changes, the cached list is
+    re-ranked in memory; it is only rebuilt when the change could let a
+    movie outside the list move in and the list cannot tell which one.
+    Updates to a cached board hold its lock so concurrent writers do not
+    overwrite each other's changes.
+    """
+
+    @staticmethod
+    def size():
+        return getattr(settings, 'RATINGS_LEADERBOARD', {}).get('SIZE', 100)
+
+    @staticmethod
+    def build_entry(aggregate, movie):
+        return {
+            'id': movie.id,
+            'name': movie.name,
+            'image': movie.thumbnail_url,
+            'price': movie.price,
+            'average_rating': aggregate.average_rating,
+            'bayesian_score': aggregate.bayesian_score,
+            'total_ratings': aggregate.total_ratings,
+            'rating_distribution': {
+                1: aggregate.rating_1_count,
+                2: aggregate.rating_2_count,
+                3: aggregate.rating_3_count,
+                4: aggregate.rating_4_count,
+                5: aggregate.rating_5_count,
+            }
+        }
+
+    @staticmethod
+    def query(board, limit):
+        aggregates = RatingAggregate.objects.filter(
+            total_ratings__gte=1
+        ).select_related('movie').order_by(*BOARDS[board]['ordering'])[:limit]
+        return [RatingLeaderboard.build_entry(aggregate, aggregate.movie) for aggregate in aggregates]
+
+    @staticmethod
+    def get(board, limit=10):
+        """The best ``limit`` entries of a board"""
+        size = RatingLeaderboard.size()
+        if limit > size:
+            return RatingLeaderboard.query(board, limit)
+
+        cached = cache.get(_cache_key(board))
+        if cached is None:
+            cached = {'entries': RatingLeaderboard.query(board, size), 'expires_at': time.time() + LEADERBOARD_TIMEOUT}
+            cache.set(_cache_key(board), cached, LEADERBOARD_TIMEOUT)
+        return cached['entries'][:limit]
+
+    @staticmethod
+    @contextmanager
+    def bulk_changes():
+        """Skip per-aggregate updates inside the block and drop the boards once at the end"""
+        depth = getattr(_bulk, 'depth', 0)
+        _bulk.depth = depth + 1
+        try:
+            yield
+        finally:
+            _bulk.depth = depth
+            if depth == 0:
+                RatingLeaderboard.invalidate()
+
+    @staticmethod
+    def invalidate():
+        """Drop every cached board once the current transaction commits"""
+        transaction.on_commit(RatingLeaderboard._drop_boards)
+
+    @staticmethod
+    def _drop_boards():
+        for board in BOARDS:
+            with _board_lock(board):
+                cache.delete(_cache_key(board))
+
+    @staticmethod
+    def note_aggregate_change(aggregate, deleted=False):
+        """Re-rank cached boards once a change to one movie's aggregate commits
+
+        Deferred so a rolled-back write never reaches the cache and the
+        board lock is never waited on while the write transaction is open.
+        """
+        if getattr(_bulk, 'depth', 0):
+            return
+        transaction.on_commit(lambda: RatingLeaderboard._apply_change(aggregate, deleted))
+
+    @staticmethod
+    def _apply_change(aggregate, deleted):
+        for board in BOARDS:
+            with _board_lock(board) as locked:
+                if locked:
+                    RatingLeaderboard._rerank(board, aggregate, deleted)
+                else:
+                    # Patching without the lock could lose a concurrent update
+                    cache.delete(_cache_key(board))
+
+    @staticmethod
+    def _rerank(board, aggregate, deleted):
+        from movies.services import MovieLookupService
+
+        size = RatingLeaderboard.size()
+        key = _cache_key(board)
+        cached = cache.get(key)
+        if cached is None:
+            return
+        remaining = cached['expires_at'] - time.time()
+        sort_key = BOARDS[board]['sort_key']
+
+        # A full list may have more movies below it; a shorter one holds them all
+        was_full = len(cached['entries']) >= size
+        entries = [entry for entry in cached['entries'] if entry['id'] != aggregate.movie_id]
+        was_listed = len(entries) < len(cached['entries'])
+        if was_full and not entries:
+            # Nothing is left to rank against; rebuild on the next read
+            cache.delete(key)
+            return
+
+        entry = None
+        if not deleted and aggregate.total_ratings >= 1:
+            movie = MovieLookupService.get(aggregate.movie_id)
+            if movie is not None:
+                entry = RatingLeaderboard.build_entry(aggregate, movie)
+
+        if entry is not None and (not was_full or sort_key(entry) < sort_key(entries[-1])):
+            entries.append(entry)
+            entries.sort(key=sort_key)
+            del entries[size:]
+        elif was_listed and was_full:
+            # The movie dropped out of a full list and something unseen
+            # may now belong in its place
+            cache.delete(key)
+            return
+        elif not was_listed:
+            return
+
+        if remaining > 0:
+            cache.set(key, {'entries': entries, 'expires_at': cached['expires_at']}, remaining)
+        else:
+            cache.delete(key)
+
+    @staticmethod
+    def note_movie_change(movie_id):
+        """Drop cached boards that show a movie whose name, price or image changed"""
+        for board in BOARDS:
+            key = _cache_key(board)
+            cached = cache.get(key)
+            if cached is not None and any(entry['id'] == movie_id for entry in cached['entries']):
+                cache.delete(key)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from ratings.services import RatingService
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day rating rollups from the ratings table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movie-ids', type=int, nargs='+', help='Only rebuild these movies')
+        parser.add_argument('--batch-size', type=int, default=200, help='Movies rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding daily rating rollups...')
+        written = RatingService.rebuild_daily_rollups(options['movie_ids'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {written} daily rollup rows'))
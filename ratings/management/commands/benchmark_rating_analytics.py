@@ -0,0 +1,119 @@
+import random
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from movies.benchmarking import backdate, time_calls
+from movies.models import Movie
+from ratings.models import MovieRating
+from ratings.services import RatingCalculator, RatingService
+
+
+def python_weighted_average(movie):
+    """The previous row-by-row implementation, kept for comparison"""
+    now = timezone.now()
+    total_weight = 0
+    weighted_sum = 0
+    for rating in MovieRating.objects.filter(movie=movie):
+        weight = max(0.1, 1.0 - ((now - rating.created_at).days / 365.0))
+        weighted_sum += rating.rating * weight
+        total_weight += weight
+    return round(weighted_sum / total_weight, 1) if total_weight > 0 else 0.0
+
+
+def python_rating_trends(movie, days=30):
+    """The previous row-by-row implementation, kept for comparison"""
+    end_date = timezone.now()
+    daily_ratings = {}
+    ratings = MovieRating.objects.filter(
+        movie=movie, created_at__gte=end_date - timedelta(days=days), created_at__lte=end_date
+    ).order_by('created_at')
+    for rating in ratings:
+        daily_ratings.setdefault(rating.created_at.date(), []).append(rating.rating)
+    return [
+        {'date': date, 'average_rating': round(sum(values) / len(values), 1), 'count': len(values)}
+        for date, values in daily_ratings.items()
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark RatingCalculator analytics against row-by-row Python (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='Ratings on the benchmark movie'
+        )
+        parser.add_argument('--movies', type=int, default=20, help='Movies sharing the ratings for the batch variants')
+        parser.add_argument('--history-days', type=int, default=400, help='Spread of rating dates')
+        parser.add_argument('--skip-python', action='store_true', help='Do not time the row-by-row implementation')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        self.stdout.write(
+            f"{'ratings':>10} {'check':>14} {'python':>10} {'rollups':>10} {'batch':>10}"
+        )
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                movies = self.create_data(size, options['movies'], options['history_days'])
+                movie = movies[0]
+                movie_ids = [m.id for m in movies]
+
+                checks = [
+                    (
+                        'weighted avg',
+                        lambda: python_weighted_average(movie),
+                        lambda: RatingCalculator.calculate_weighted_average_rating(movie),
+                        lambda: RatingCalculator.calculate_weighted_average_ratings(movie_ids),
+                    ),
+                    (
+                        'trends (30d)',
+                        lambda: python_rating_trends(movie),
+                        lambda: RatingCalculator.calculate_rating_trends(movie),
+                        lambda: RatingCalculator.calculate_rating_trends_for_movies(movie_ids),
+                    ),
+                ]
+                for label, python_version, rollup_version, batch_version in checks:
+                    python_ms = None
+                    if not options['skip_python']:
+                        python_ms, _ = time_calls(python_version)
+                    rollup_ms, _ = time_calls(rollup_version)
+                    batch_ms, _ = time_calls(batch_version)
+                    python_text = f'{python_ms:.1f}ms' if python_ms is not None else '-'
+                    self.stdout.write(
+                        f'{size:>10} {label:>14} {python_text:>10} {rollup_ms:>8.1f}ms {batch_ms:>8.1f}ms'
+                    )
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Benchmark finished; batch columns cover {options["movies"]} movies in one call')
+        )
+
+    def create_data(self, size, movie_count, history_days):
+        """One movie with ``size`` ratings and smaller movies sharing the same raters"""
+        movies = Movie.objects.bulk_create(
+            [Movie(name=f'Benchmark Movie {i}', price=1, description='', image='') for i in range(movie_count)]
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'bench-analytics-{i}', password='!') for i in range(size)],
+            batch_size=5000
+        )
+
+        def ratings():
+            for index, user in enumerate(users):
+                # The first movie gets every rating, the rest a thin slice each
+                for movie in movies[:1] if index % 10 else movies:
+                    yield MovieRating(user=user, movie=movie, rating=random.randint(1, 5))
+
+        batch = []
+        for rating in ratings():
+            batch.append(rating)
+            if len(batch) == 5000:
+                MovieRating.objects.bulk_create(batch)
+                batch = []
+        MovieRating.objects.bulk_create(batch)
+        backdate(MovieRating.objects.filter(movie__in=movies), 'created_at', timezone.now(), history_days * 86400)
+        RatingService.rebuild_daily_rollups([movie.id for movie in movies])
+        return movies
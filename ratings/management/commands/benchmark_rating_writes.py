@@ -0,0 +1,56 @@
+import random
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from movies.models import Movie
+from ratings.models import MovieRating, RatingAggregate
+from ratings.services import RatingService
+
+class Command(BaseCommand):
+    help = 'Benchmark rating write latency as a movie accumulates ratings (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+            help='Existing ratings on the movie before timing writes'
+        )
+        parser.add_argument('--writes', type=int, default=50, help='Timed writes per size')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        self.stdout.write(f"{'ratings':>10} {'incremental write':>20} {'full recompute':>16}")
+
+        for size in options['sizes']:
+            with transaction.atomic():
+                movie = Movie.objects.create(name='Benchmark Movie', price=1, description='', image='')
+                users = User.objects.bulk_create(
+                    [User(username=f'bench-rater-{i}', password='!') for i in range(size + options['writes'])],
+                    batch_size=5000
+                )
+                MovieRating.objects.bulk_create(
+                    [MovieRating(user=user, movie=movie, rating=random.randint(1, 5)) for user in users[:size]],
+                    batch_size=5000
+                )
+                RatingService.update_movie_rating_aggregate(movie)
+
+                incremental = []
+                for user in users[size:]:
+                    start = time.perf_counter()
+                    RatingService.create_or_update_rating(user, movie, random.randint(1, 5))
+                    incremental.append((time.perf_counter() - start) * 1000)
+
+                aggregate = RatingAggregate.objects.get(movie=movie)
+                recompute = []
+                for _ in range(min(options['writes'], 5)):
+                    start = time.perf_counter()
+                    aggregate.update_aggregate()
+                    recompute.append((time.perf_counter() - start) * 1000)
+
+                self.stdout.write(
+                    f'{size:>10} {statistics.median(incremental):>17.2f} ms {statistics.median(recompute):>13.2f} ms'
+                )
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; synthetic data rolled back'))
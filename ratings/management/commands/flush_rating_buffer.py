@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from ratings.services import RatingWriteBuffer
+
+class Command(BaseCommand):
+    help = 'Apply queued write-behind rating changes to the rating aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Seconds between flushes (default: RATINGS_WRITE_BEHIND["FLUSH_INTERVAL"])'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=RatingWriteBuffer.FLUSH_BATCH_SIZE,
+            help='Queued changes applied per transaction'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or RatingWriteBuffer.get_settings()['FLUSH_INTERVAL']
+
+        if options['once']:
+            flushed = self.drain(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} rating changes'))
+            return
+
+        self.stdout.write(f'Flushing rating changes every {interval}s (Ctrl+C to stop)...')
+        try:
+            while True:
+                started = time.monotonic()
+                flushed = self.drain(options['batch_size'])
+                if flushed:
+                    self.stdout.write(f'  flushed {flushed} rating changes')
+                time.sleep(max(0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Stopped'))
+
+    def drain(self, batch_size):
+        total = 0
+        while True:
+            flushed = RatingWriteBuffer.flush(batch_size)
+            total += flushed
+            if flushed < batch_size:
+                return total
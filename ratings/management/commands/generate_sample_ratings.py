@@ -48,8 +48,9 @@ class Command(BaseCommand):
                 )
                 total_ratings += 1
         
-        # Update all rating aggregates
+        # Update all rating aggregates and daily rollups
         RatingService.update_all_rating_aggregates()
+        RatingService.rebuild_daily_rollups()
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully generated {total_ratings} sample ratings')
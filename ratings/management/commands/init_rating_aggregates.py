@@ -1,20 +1,56 @@
-from django.core.management.base import BaseCommand
-from movies.models import Movie
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
 from ratings.services import RatingService
 
 class Command(BaseCommand):
-    help = 'Initialize rating aggregates for all movies'
+    help = 'Initialize rating aggregates for all movies, or check them for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Report aggregates that differ from the ratings without rewriting them')
+        parser.add_argument('--movie-ids', type=int, nargs='+', help='Only rebuild these movies')
+        parser.add_argument('--since', help='Only rebuild movies rated or re-rated since this date or datetime (ISO 8601)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Movies aggregated per query')
 
     def handle(self, *args, **options):
+        since = self.parse_since(options['since'])
+        scope = {'movie_ids': options['movie_ids'], 'since': since, 'batch_size': options['batch_size']}
+
+        if options['verify']:
+            self.stdout.write('Verifying rating aggregates...')
+            drift = RatingService.find_rating_aggregate_drift(**scope)
+            for movie_id, stored, truth in drift:
+                if stored is None:
+                    self.stdout.write(f'  movie {movie_id}: missing aggregate (expected {truth["total_ratings"]} ratings)')
+                    continue
+                differences = ', '.join(
+                    f'{field} {stored[field]} != {value}' for field, value in truth.items() if stored[field] != value
+                )
+                self.stdout.write(f'  movie {movie_id}: {differences}')
+            if drift:
+                self.stdout.write(self.style.WARNING(f'{len(drift)} rating aggregates have drifted'))
+            else:
+                self.stdout.write(self.style.SUCCESS('All rating aggregates match the ratings'))
+            return
+
         self.stdout.write('Initializing rating aggregates...')
-        
-        movies = Movie.objects.all()
-        updated_count = 0
-        
-        for movie in movies:
-            RatingService.update_movie_rating_aggregate(movie)
-            updated_count += 1
-        
+        checked_count, updated_count = RatingService.rebuild_rating_aggregates(**scope)
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully initialized rating aggregates for {updated_count} movies')
+            self.style.SUCCESS(
+                f'Successfully initialized rating aggregates for {checked_count} movies ({updated_count} changed)'
+            )
         )
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f'Invalid --since value {value!r}; use YYYY-MM-DD or an ISO 8601 datetime')
+            since = datetime.combine(date, time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
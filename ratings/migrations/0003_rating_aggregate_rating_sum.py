@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:36
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_rating_sums(apps, schema_editor):
+    MovieRating = apps.get_model('ratings', 'MovieRating')
+    RatingAggregate = apps.get_model('ratings', 'RatingAggregate')
+    sums = MovieRating.objects.values('movie_id').annotate(total=Sum('rating')).order_by()
+    for row in sums.iterator():
+        RatingAggregate.objects.filter(movie_id=row['movie_id']).update(rating_sum=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ratings', '0002_rating_aggregate_last_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ratingaggregate',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_sums, migrations.RunPython.noop),
+    ]
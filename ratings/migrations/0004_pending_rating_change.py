@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_review_movie_date_index'),
+        ('ratings', '0003_rating_aggregate_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRatingChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('old_rating', models.IntegerField(null=True)),
+                ('new_rating', models.IntegerField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_rating_changes', to='movies.movie')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_review_movie_date_index'),
+        ('ratings', '0004_pending_rating_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movierating',
+            index=models.Index(fields=['movie', 'created_at'], name='ratings_mov_movie_i_3dd151_idx'),
+        ),
+    ]
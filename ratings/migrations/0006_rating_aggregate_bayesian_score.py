@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+
+
+def backfill_bayesian_scores(apps, schema_editor):
+    RatingAggregate = apps.get_model('ratings', 'RatingAggregate')
+    leaderboard = getattr(settings, 'RATINGS_LEADERBOARD', {})
+    prior_mean = float(leaderboard.get('PRIOR_MEAN', 3.0))
+    prior_weight = float(leaderboard.get('PRIOR_WEIGHT', 10))
+    RatingAggregate.objects.filter(total_ratings__gt=0).update(
+        bayesian_score=(Value(prior_mean * prior_weight) + F('rating_sum'))
+        / (Value(prior_weight) + Cast('total_ratings', FloatField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_review_movie_date_index'),
+        ('ratings', '0005_rating_movie_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ratingaggregate',
+            name='bayesian_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(backfill_bayesian_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ratingaggregate',
+            index=models.Index(fields=['-bayesian_score', '-total_ratings'], name='ratings_rat_bayesia_7d63ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingaggregate',
+            index=models.Index(fields=['-total_ratings', '-average_rating'], name='ratings_rat_total_r_9a6a17_idx'),
+        ),
+    ]
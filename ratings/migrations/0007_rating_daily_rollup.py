@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import timezone
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_rollups(apps, schema_editor):
+    MovieRating = apps.get_model('ratings', 'MovieRating')
+    RatingDailyRollup = apps.get_model('ratings', 'RatingDailyRollup')
+    counts = {f'rating_{value}_count': Count('id', filter=Q(rating=value)) for value in range(1, 6)}
+    rows = MovieRating.objects.annotate(
+        date=TruncDate('created_at', tzinfo=timezone.utc)
+    ).values('movie_id', 'date').annotate(count=Count('id'), rating_sum=Sum('rating'), **counts).order_by()
+    RatingDailyRollup.objects.bulk_create([RatingDailyRollup(**row) for row in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_review_movie_date_index'),
+        ('ratings', '0006_rating_aggregate_bayesian_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingratingchange',
+            name='rated_on',
+            field=models.DateField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='RatingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_1_count', models.IntegerField(default=0)),
+                ('rating_2_count', models.IntegerField(default=0)),
+                ('rating_3_count', models.IntegerField(default=0)),
+                ('rating_4_count', models.IntegerField(default=0)),
+                ('rating_5_count', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_rollups', to='movies.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'date'), name='unique_rating_rollup_per_day')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
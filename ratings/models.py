@@ -1,8 +1,44 @@
+from datetime import timezone as dt_timezone
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
 from django.db import models
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
 from django.contrib.auth.models import User
 from movies.models import Movie
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+def calculate_average(rating_sum, total_ratings):
+    """Average rounded to one decimal, half away from zero like SQL ROUND()"""
+    if not total_ratings:
+        return 0.0
+    average = Decimal(rating_sum) / Decimal(total_ratings)
+    return float(average.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
+
+def get_score_prior():
+    """(prior mean, prior weight) used to damp averages of rarely rated movies"""
+    leaderboard = getattr(settings, 'RATINGS_LEADERBOARD', {})
+    return float(leaderboard.get('PRIOR_MEAN', 3.0)), float(leaderboard.get('PRIOR_WEIGHT', 10))
+
+def calculate_bayesian_score(rating_sum, total_ratings):
+    """Average pulled toward the prior mean as if PRIOR_WEIGHT extra ratings of that value existed
+
+    Like average_rating, the score is 0.0 for a movie without ratings.
+    """
+    if not total_ratings:
+        return 0.0
+    prior_mean, prior_weight = get_score_prior()
+    return (prior_mean * prior_weight + rating_sum) / (prior_weight + total_ratings)
+
+def bayesian_score_expression(rating_sum, total_ratings):
+    """calculate_bayesian_score as a database expression, evaluated in the same order"""
+    prior_mean, prior_weight = get_score_prior()
+    return ExpressionWrapper(
+        (Value(prior_mean * prior_weight) + rating_sum) / (Value(prior_weight) + total_ratings),
+        output_field=FloatField()
+    )
+
 class MovieRating(models.Model):
     """Model for storing user ratings of movies (1-5 stars)"""
     RATING_CHOICES = [
@@ -29,6 +65,7 @@ class MovieRating(models.Model):
         indexes = [
             models.Index(fields=['movie', 'rating']),
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['movie', 'created_at']),
         ]
     
     def __str__(self):
@@ -69,33 +106,173 @@ class RatingAggregate(models.Model):
     rating_3_count = models.IntegerField(default=0)
     rating_4_count = models.IntegerField(default=0)
     rating_5_count = models.IntegerField(default=0)
-    last_updated = models.DateTimeField(auto_now=True)
+    rating_sum = models.IntegerField(default=0)
+    # Damped average that ranks the leaderboard, kept in step with rating_sum
+    bayesian_score = models.FloatField(default=0.0)
+    last_updated = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-bayesian_score', '-total_ratings']),
+            models.Index(fields=['-total_ratings', '-average_rating']),
+        ]
     
     def __str__(self):
         return f"{self.movie.name} - {self.average_rating}/5 ({self.total_ratings} ratings)"
     
     def update_aggregate(self):
         """Update the aggregate statistics from actual ratings"""
-        ratings = MovieRating.objects.filter(movie=self.movie)
-        
-        if not ratings.exists():
-            self.average_rating = 0.0
-            self.total_ratings = 0
-            self.rating_1_count = 0
-            self.rating_2_count = 0
-            self.rating_3_count = 0
-            self.rating_4_count = 0
-            self.rating_5_count = 0
-        else:
-            self.total_ratings = ratings.count()
-            self.average_rating = round(sum(r.rating for r in ratings) / self.total_ratings, 1)
-            
-            # Count each rating level
-            distribution = MovieRating.get_rating_distribution(self.movie)
-            self.rating_1_count = distribution.get(1, 0)
-            self.rating_2_count = distribution.get(2, 0)
-            self.rating_3_count = distribution.get(3, 0)
-            self.rating_4_count = distribution.get(4, 0)
-            self.rating_5_count = distribution.get(5, 0)
-        
+        distribution = dict(
+            MovieRating.objects.filter(movie=self.movie)
+            .values_list('rating')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        self.rating_1_count = distribution.get(1, 0)
+        self.rating_2_count = distribution.get(2, 0)
+        self.rating_3_count = distribution.get(3, 0)
+        self.rating_4_count = distribution.get(4, 0)
+        self.rating_5_count = distribution.get(5, 0)
+        self.total_ratings = sum(distribution.values())
+        self.rating_sum = sum(rating * count for rating, count in distribution.items())
+        self.average_rating = calculate_average(self.rating_sum, self.total_ratings)
+        self.bayesian_score = calculate_bayesian_score(self.rating_sum, self.total_ratings)
         self.save()
+
+    @classmethod
+    def apply_rating_change(cls, movie, old_rating=None, new_rating=None):
+        """Adjust the stored counters for one rating being added, changed or removed.
+
+        Pass old_rating=None for a new rating and new_rating=None for a
+        deleted one. Returns False if the movie has no aggregate row yet.
+        """
+        if old_rating == new_rating:
+            return True
+
+        distribution_delta = {}
+        if old_rating is not None:
+            distribution_delta[old_rating] = -1
+        if new_rating is not None:
+            distribution_delta[new_rating] = distribution_delta.get(new_rating, 0) + 1
+        return cls.apply_deltas(
+            movie,
+            count_delta=(new_rating is not None) - (old_rating is not None),
+            sum_delta=(new_rating or 0) - (old_rating or 0),
+            distribution_delta=distribution_delta,
+        )
+
+    @classmethod
+    def apply_deltas(cls, movie, count_delta, sum_delta, distribution_delta):
+        """Add net changes to a movie's counters in place.
+
+        Runs as a single UPDATE with F() expressions, so the cost does not
+        depend on how many ratings the movie has. distribution_delta maps a
+        star value to the change in its count. Returns False if the movie
+        has no aggregate row yet.
+        """
+        new_total = F('total_ratings') + count_delta
+        new_sum = F('rating_sum') + sum_delta
+
+        updates = {
+            'total_ratings': new_total,
+            'rating_sum': new_sum,
+            # Column references see pre-update values, so the average is
+            # derived from the same deltas rather than the new columns
+            'average_rating': Case(
+                When(total_ratings__lte=-count_delta, then=Value(0.0)),
+                default=Round(Cast(new_sum, FloatField()) / new_total, 1),
+                output_field=FloatField(),
+            ),
+            'bayesian_score': Case(
+                When(total_ratings__lte=-count_delta, then=Value(0.0)),
+                default=bayesian_score_expression(new_sum, new_total),
+                output_field=FloatField(),
+            ),
+            'last_updated': timezone.now(),
+        }
+        for rating_value, delta in distribution_delta.items():
+            if delta:
+                updates[f'rating_{rating_value}_count'] = F(f'rating_{rating_value}_count') + delta
+
+        return cls.objects.filter(movie=movie).update(**updates) > 0
+
+class PendingRatingChange(models.Model):
+    """A rating write whose aggregate update is deferred (write-behind mode).
+
+    Rows are only ever appended by rating writes and consumed in batches by
+    RatingWriteBuffer.flush(), so concurrent raters of one movie never wait
+    on its RatingAggregate row.
+    """
+    id = models.BigAutoField(primary_key=True)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='pending_rating_changes')
+    # Creation day of the rating, which picks its RatingDailyRollup row
+    rated_on = models.DateField()
+    old_rating = models.IntegerField(null=True)
+    new_rating = models.IntegerField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.movie_id}: {self.old_rating} -> {self.new_rating}"
+
+class RatingDailyRollup(models.Model):
+    """Per-movie, per-day totals of the ratings created that day
+
+    Rows track the current value of each rating, so a re-rating moves stars
+    within its original day and a deletion removes them. Trend and
+    weighted-average queries read these rows instead of MovieRating.
+    """
+    id = models.BigAutoField(primary_key=True)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='rating_rollups')
+    date = models.DateField()
+    count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'date'], name='unique_rating_rollup_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.movie_id} on {self.date}: {self.count} ratings"
+
+    @staticmethod
+    def day_of(created_at):
+        """The rollup day a rating belongs to (UTC)"""
+        return created_at.astimezone(dt_timezone.utc).date()
+
+    @classmethod
+    def apply_rating_change(cls, movie, date, old_rating=None, new_rating=None):
+        """Adjust one day's totals for a rating being added, changed or removed"""
+        distribution_delta = {}
+        if old_rating is not None:
+            distribution_delta[old_rating] = -1
+        if new_rating is not None:
+            distribution_delta[new_rating] = distribution_delta.get(new_rating, 0) + 1
+        cls.apply_deltas(
+            movie, date,
+            count_delta=(new_rating is not None) - (old_rating is not None),
+            sum_delta=(new_rating or 0) - (old_rating or 0),
+            distribution_delta=distribution_delta,
+        )
+
+    @classmethod
+    def apply_deltas(cls, movie, date, count_delta, sum_delta, distribution_delta):
+        """Add net changes to one day's totals with a single F() update, creating the row if needed"""
+        updates = {
+            f'rating_{rating_value}_count': F(f'rating_{rating_value}_count') + delta
+            for rating_value, delta in distribution_delta.items() if delta
+        }
+        if not updates and not count_delta and not sum_delta:
+            return
+        movie_id = getattr(movie, 'pk', movie)
+        cls.objects.bulk_create([cls(movie_id=movie_id, date=date)], ignore_conflicts=True)
+        cls.objects.filter(movie_id=movie_id, date=date).update(
+            count=F('count') + count_delta,
+            rating_sum=F('rating_sum') + sum_delta,
+            **updates
+        )
@@ -1,8 +1,26 @@
+import math
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
 from django.utils import timezone
-from .models import MovieRating, RatingAggregate
+from django.utils.dateparse import parse_datetime
+from .leaderboard import RatingLeaderboard
+from .models import (
+    MovieRating, PendingRatingChange, RatingAggregate, RatingDailyRollup,
+    calculate_average, calculate_bayesian_score,
+)
+from .signals import rating_aggregate_updated
+from movies.cache import get_movie_version, get_or_compute
 from movies.models import Movie
+from movies.pagination import InvalidCursor, decode_cursor, encode_cursor, get_page_size
+
+AGGREGATE_FIELDS = [
+    'average_rating', 'bayesian_score', 'total_ratings', 'rating_sum',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+]
 
 class RatingService:
     """Service class for managing movie ratings and calculations"""
@@ -15,34 +33,115 @@ class RatingService:
         
         with transaction.atomic():
             # Create or update the rating
-            rating, created = MovieRating.objects.get_or_create(
+            rating, created = MovieRating.objects.select_for_update().get_or_create(
                 user=user,
                 movie=movie,
                 defaults={'rating': rating_value}
             )
             
+            old_rating = None
             if not created:
+                old_rating = rating.rating
                 rating.rating = rating_value
                 rating.save()
             
-            # Update the aggregate statistics
-            RatingService.update_movie_rating_aggregate(movie)
+            # Apply the change to the aggregate statistics
+            RatingService.record_rating_change(movie, old_rating, rating_value, rating.created_at)
             
             return rating, created
     
     @staticmethod
     def delete_rating(user, movie):
         """Delete a user's rating for a movie"""
-        try:
-            rating = MovieRating.objects.get(user=user, movie=movie)
+        with transaction.atomic():
+            try:
+                rating = MovieRating.objects.select_for_update().get(user=user, movie=movie)
+            except MovieRating.DoesNotExist:
+                return False
             rating.delete()
             
-            # Update the aggregate statistics
-            RatingService.update_movie_rating_aggregate(movie)
+            # Apply the change to the aggregate statistics
+            RatingService.record_rating_change(movie, rating.rating, None, rating.created_at)
             
             return True
-        except MovieRating.DoesNotExist:
-            return False
+    
+    @staticmethod
+    def create_or_update_ratings(user, ratings):
+        """Apply many ratings by one user in a single transaction
+
+        ratings maps movie id to rating value. Ratings are written with one
+        bulk insert and one bulk update, then each affected movie gets a
+        single aggregate update. Returns {movie_id: (rating, created)}.
+        """
+        for movie_id, rating_value in ratings.items():
+            if not (1 <= rating_value <= 5):
+                raise ValueError(f"Rating for movie {movie_id} must be between 1 and 5")
+        
+        with transaction.atomic():
+            movies = Movie.objects.only('id').in_bulk(list(ratings))
+            missing = sorted(set(ratings) - set(movies))
+            if missing:
+                raise Movie.DoesNotExist(f"Movies not found: {', '.join(map(str, missing))}")
+            
+            existing = {
+                rating.movie_id: rating
+                for rating in MovieRating.objects.select_for_update().filter(user=user, movie_id__in=list(ratings))
+            }
+            now = timezone.now()
+            results = {}
+            changes = []
+            to_create = []
+            to_update = []
+            for movie_id, rating_value in ratings.items():
+                rating = existing.get(movie_id)
+                if rating is None:
+                    rating = MovieRating(user=user, movie_id=movie_id, rating=rating_value)
+                    to_create.append(rating)
+                    changes.append((rating, None))
+                    results[movie_id] = (rating, True)
+                    continue
+                results[movie_id] = (rating, False)
+                if rating.rating != rating_value:
+                    changes.append((rating, rating.rating))
+                    rating.rating = rating_value
+                    # bulk_update does not apply auto_now
+                    rating.updated_at = now
+                    to_update.append(rating)
+            
+            MovieRating.objects.bulk_create(to_create)
+            MovieRating.objects.bulk_update(to_update, ['rating', 'updated_at'])
+            
+            # Apply the changes to the aggregate statistics
+            for rating, old_rating in changes:
+                RatingService.record_rating_change(
+                    movies[rating.movie_id], old_rating, rating.rating, rating.created_at
+                )
+            
+            return results
+    
+    @staticmethod
+    def record_rating_change(movie, old_rating, new_rating, rated_at):
+        """Apply a rating change now, or queue it when write-behind is enabled
+
+        rated_at is when the rating was first created, which picks the
+        daily rollup it is counted in.
+        """
+        rated_on = RatingDailyRollup.day_of(rated_at)
+        if RatingWriteBuffer.is_enabled():
+            return RatingWriteBuffer.record(movie, old_rating, new_rating, rated_on)
+        RatingDailyRollup.apply_rating_change(movie, rated_on, old_rating, new_rating)
+        return RatingService.apply_rating_change(movie, old_rating, new_rating)
+    
+    @staticmethod
+    def apply_rating_change(movie, old_rating, new_rating):
+        """Update a movie's aggregate in O(1) for a single rating change"""
+        if not RatingAggregate.apply_rating_change(movie, old_rating, new_rating):
+            # No aggregate row yet: build it once from the ratings table
+            return RatingService.update_movie_rating_aggregate(movie)
+        
+        aggregate = RatingAggregate.objects.get(movie=movie)
+        rating_aggregate_updated.send(sender=RatingAggregate, instance=aggregate)
+        return aggregate
     
     @staticmethod
     def get_user_rating(user, movie):
@@ -53,11 +152,53 @@ class RatingService:
             return None
     
     @staticmethod
-    def get_movie_rating_stats(movie):
-        """Get comprehensive rating statistics for a movie"""
-        try:
-            aggregate = RatingAggregate.objects.get(movie=movie)
-            return {
+    def get_user_ratings(user, movie_ids):
+        """Get a user's ratings for many movies as {movie_id: MovieRating}"""
+        return {
+            rating.movie_id: rating
+            for rating in MovieRating.objects.filter(user=user, movie_id__in=movie_ids)
+        }
+    
+    @staticmethod
+    def get_movie_rating_stats(movie, include_pending=False):
+        """Get comprehensive rating statistics for a movie
+
+        With include_pending, changes still queued in the write-behind
+        buffer are folded in, so a user sees their own rating immediately.
+        """
+        include_pending_for = [movie.id] if include_pending else []
+        return RatingService.get_movie_rating_stats_many([movie.id], include_pending_for)[movie.id]
+    
+    @staticmethod
+    def get_movie_rating_stats_many(movie_ids, include_pending_for=()):
+        """Get rating statistics for many movies as {movie_id: stats} with one query
+
+        Queued write-behind changes are folded in for the movies listed in
+        include_pending_for, which costs one more query.
+        """
+        RatingWriteBuffer.ensure_fresh()
+        aggregates = RatingAggregate.objects.in_bulk(movie_ids, field_name='movie_id')
+        pending = {}
+        if include_pending_for and RatingWriteBuffer.is_enabled():
+            # A movie's first ratings may exist only in the queue
+            pending = RatingWriteBuffer.get_deltas(movie_ids=list(include_pending_for))
+        return {
+            movie_id: RatingService.build_rating_stats(aggregates.get(movie_id), pending.get(movie_id))
+            for movie_id in movie_ids
+        }
+    
+    @staticmethod
+    def build_rating_stats(aggregate, pending=None):
+        """Stats dict for one aggregate, or zeroed stats without one, plus optional queued deltas"""
+        stats = {
+            'average_rating': 0.0,
+            'total_ratings': 0,
+            'rating_distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+            'last_updated': None
+        }
+        rating_sum = 0
+        if aggregate is not None:
+            stats = {
                 'average_rating': aggregate.average_rating,
                 'total_ratings': aggregate.total_ratings,
                 'rating_distribution': {
@@ -69,13 +210,13 @@ class RatingService:
                 },
                 'last_updated': aggregate.last_updated
             }
-        except RatingAggregate.DoesNotExist:
-            return {
-                'average_rating': 0.0,
-                'total_ratings': 0,
-                'rating_distribution': {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
-                'last_updated': None
-            }
+            rating_sum = aggregate.rating_sum
+        if pending:
+            stats['total_ratings'] += pending['count_delta']
+            for rating_value, delta in pending['distribution_delta'].items():
+                stats['rating_distribution'][rating_value] += delta
+            stats['average_rating'] = calculate_average(rating_sum + pending['sum_delta'], stats['total_ratings'])
+        return stats
     
     @staticmethod
     def update_movie_rating_aggregate(movie):
@@ -87,95 +228,510 @@ class RatingService:
     @staticmethod
     def update_all_rating_aggregates():
         """Update rating aggregates for all movies"""
-        movies = Movie.objects.all()
-        for movie in movies:
-            RatingService.update_movie_rating_aggregate(movie)
+        return RatingService.rebuild_rating_aggregates()
+    
+    @staticmethod
+    def compute_rating_aggregates(movie_ids):
+        """True aggregate values for the given movies from one grouped query over MovieRating"""
+        counts = {
+            f'rating_{rating_value}_count': Count('id', filter=Q(rating=rating_value))
+            for rating_value, _ in MovieRating.RATING_CHOICES
+        }
+        rows = MovieRating.objects.filter(movie_id__in=movie_ids).values('movie_id').annotate(
+            total_ratings=Count('id'), rating_sum=Sum('rating'), **counts
+        ).order_by()
+        
+        empty = {field: 0 for field in AGGREGATE_FIELDS}
+        empty['average_rating'] = 0.0
+        empty['bayesian_score'] = 0.0
+        truth = {movie_id: dict(empty) for movie_id in movie_ids}
+        for row in rows:
+            values = truth[row.pop('movie_id')]
+            values.update(row)
+            values['average_rating'] = calculate_average(row['rating_sum'], row['total_ratings'])
+            values['bayesian_score'] = calculate_bayesian_score(row['rating_sum'], row['total_ratings'])
+        return truth
+    
+    @staticmethod
+    def get_rebuild_movie_ids(movie_ids=None, since=None):
+        """Movies a partial rebuild should cover; all movies when no filter is given"""
+        movies = Movie.objects.order_by('id')
+        if movie_ids is not None:
+            movies = movies.filter(id__in=movie_ids)
+        if since is not None:
+            # Deleted ratings leave no trace here; --verify catches those
+            movies = movies.filter(ratings__updated_at__gte=since).distinct()
+        return list(movies.values_list('id', flat=True))
+    
+    @staticmethod
+    def find_rating_aggregate_drift(movie_ids=None, since=None, batch_size=1000):
+        """Compare stored aggregates with the ratings table without writing anything
+
+        Returns a list of (movie_id, stored values or None, true values). A
+        missing aggregate counts as zero ratings. Movies with queued
+        write-behind changes are skipped, since their aggregates are
+        expected to lag until the next flush.
+        """
+        ids = RatingService.get_rebuild_movie_ids(movie_ids, since)
+        pending = set(PendingRatingChange.objects.values_list('movie_id', flat=True).distinct())
+        ids = [movie_id for movie_id in ids if movie_id not in pending]
+        
+        drift = []
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            truth = RatingService.compute_rating_aggregates(chunk)
+            stored = {
+                row['movie_id']: row
+                for row in RatingAggregate.objects.filter(movie_id__in=chunk).values('movie_id', *AGGREGATE_FIELDS)
+            }
+            for movie_id in chunk:
+                current = stored.get(movie_id)
+                if current is not None:
+                    current.pop('movie_id')
+                elif not truth[movie_id]['total_ratings']:
+                    # Unrated movies only get a row once they are rated
+                    continue
+                if current != truth[movie_id]:
+                    drift.append((movie_id, current, truth[movie_id]))
+        return drift
+    
+    @staticmethod
+    def rebuild_rating_aggregates(movie_ids=None, since=None, batch_size=1000):
+        """Recompute aggregates in bulk and return (movies checked, aggregates written)
+
+        Each chunk of movies costs one grouped aggregation plus one
+        bulk_update and one bulk_create, and only aggregates that actually
+        differ are written.
+        """
+        ids = RatingService.get_rebuild_movie_ids(movie_ids, since)
+        written = []
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            with transaction.atomic():
+                # Queued write-behind changes up to here are already in the
+                # ratings table, so the rebuild supersedes their aggregate
+                # deltas; their daily rollup deltas are applied here
+                pending_ids = list(
+                    PendingRatingChange.objects.select_for_update()
+                    .filter(movie_id__in=chunk).values_list('id', flat=True)
+                )
+                if pending_ids:
+                    rollup_deltas = RatingWriteBuffer.get_deltas(change_ids=pending_ids, by_date=True)
+                    for (movie_id, rated_on), delta in rollup_deltas.items():
+                        RatingDailyRollup.apply_deltas(movie_id, rated_on, **delta)
+                
+                truth = RatingService.compute_rating_aggregates(chunk)
+                existing = RatingAggregate.objects.in_bulk(chunk, field_name='movie_id')
+                now = timezone.now()
+                to_update = []
+                to_create = []
+                for movie_id, values in truth.items():
+                    aggregate = existing.get(movie_id)
+                    if aggregate is None:
+                        aggregate = RatingAggregate(movie_id=movie_id, **values)
+                        to_create.append(aggregate)
+                    elif any(getattr(aggregate, field) != value for field, value in values.items()):
+                        for field, value in values.items():
+                            setattr(aggregate, field, value)
+                        to_update.append(aggregate)
+                    else:
+                        continue
+                    aggregate.last_updated = now
+                
+                RatingAggregate.objects.bulk_update(to_update, AGGREGATE_FIELDS + ['last_updated'])
+                RatingAggregate.objects.bulk_create(to_create)
+                if pending_ids:
+                    PendingRatingChange.objects.filter(id__in=pending_ids).delete()
+            written.extend(to_update + to_create)
+        
+        # Bulk writes skip post_save, so notify the cache receivers directly;
+        # the leaderboards are dropped once rather than re-ranked per movie
+        with RatingLeaderboard.bulk_changes():
+            for aggregate in written:
+                rating_aggregate_updated.send(sender=RatingAggregate, instance=aggregate)
+        return len(ids), len(written)
+    
+    @staticmethod
+    def rebuild_daily_rollups(movie_ids=None, batch_size=200):
+        """Recompute RatingDailyRollup rows from MovieRating and return how many were written
+
+        Each chunk of movies is replaced in one transaction from a single
+        grouped query. Queued write-behind changes are flushed first, as
+        the ratings table already includes them.
+        """
+        while RatingWriteBuffer.flush():
+            pass
+        
+        ids = RatingService.get_rebuild_movie_ids(movie_ids)
+        counts = {
+            f'rating_{rating_value}_count': Count('id', filter=Q(rating=rating_value))
+            for rating_value, _ in MovieRating.RATING_CHOICES
+        }
+        written = 0
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            rows = MovieRating.objects.filter(movie_id__in=chunk).annotate(
+                date=TruncDate('created_at', tzinfo=dt_timezone.utc)
+            ).values('movie_id', 'date').annotate(
+                count=Count('id'), rating_sum=Sum('rating'), **counts
+            ).order_by()
+            with transaction.atomic():
+                RatingDailyRollup.objects.filter(movie_id__in=chunk).delete()
+                created = RatingDailyRollup.objects.bulk_create(
+                    [RatingDailyRollup(**row) for row in rows], batch_size=1000
+                )
+            written += len(created)
+        return written
+    
+    LEADERBOARD_LIMIT = 10
     
     @staticmethod
-    def get_top_rated_movies(limit=10):
-        """Get the top rated movies"""
-        return RatingAggregate.objects.filter(
-            total_ratings__gte=1
-        ).order_by('-average_rating', '-total_ratings')[:limit]
+    def get_leaderboard_limit(value):
+        """Parse a requested leaderboard length, capped at what the cached boards hold"""
+        return get_page_size(value, RatingService.LEADERBOARD_LIMIT, RatingLeaderboard.size())
     
     @staticmethod
-    def get_most_rated_movies(limit=10):
+    def get_top_rated_movies(limit=LEADERBOARD_LIMIT):
+        """Get the top rated movies, ranked by damped (Bayesian) average"""
+        RatingWriteBuffer.ensure_fresh()
+        return RatingLeaderboard.get('top_rated', limit)
+    
+    @staticmethod
+    def get_most_rated_movies(limit=LEADERBOARD_LIMIT):
         """Get the most rated movies"""
-        return RatingAggregate.objects.filter(
-            total_ratings__gte=1
-        ).order_by('-total_ratings', '-average_rating')[:limit]
+        RatingWriteBuffer.ensure_fresh()
+        return RatingLeaderboard.get('most_rated', limit)
     
     @staticmethod
     def get_user_rating_history(user, limit=20):
         """Get a user's rating history"""
-        return MovieRating.objects.filter(user=user).order_by('-created_at')[:limit]
+        return MovieRating.objects.filter(user=user).select_related('movie').order_by('-created_at', '-id')[:limit]
+    
+    HISTORY_PAGE_SIZE = 20
+    MAX_HISTORY_PAGE_SIZE = 200
+    COMPACT_HISTORY_FIELDS = ['id', 'movie_id', 'rating', 'created_at', 'updated_at']
+    
+    @staticmethod
+    def parse_history_cursor(cursor):
+        """Decode a history cursor into the (created_at, id) of the last rating shown
+        
+        Raises InvalidCursor unless it holds a timezone-aware ISO date and
+        an int id.
+        """
+        last_created, last_id = decode_cursor(cursor, 2, types=(str, int))
+        try:
+            last_created = parse_datetime(last_created)
+        except ValueError:
+            last_created = None
+        if last_created is None or last_created.tzinfo is None:
+            raise InvalidCursor('Malformed cursor')
+        return last_created, last_id
+    
+    @staticmethod
+    def get_user_rating_page(user, cursor=None, page_size=HISTORY_PAGE_SIZE, compact=False):
+        """Return (ratings, next_cursor) for one page of a user's history, newest first
+
+        Pages continue from the (created_at, id) of the last rating shown, so
+        the (user, created_at) index serves every page as a range scan no
+        matter how deep it is. Movies are joined in the same query; with
+        compact, plain dicts of COMPACT_HISTORY_FIELDS are returned instead
+        and no join is made.
+        """
+        ratings = MovieRating.objects.filter(user=user).order_by('-created_at', '-id')
+        if cursor:
+            last_created, last_id = RatingService.parse_history_cursor(cursor)
+            ratings = ratings.filter(Q(created_at__lt=last_created) | Q(created_at=last_created, id__lt=last_id))
+        
+        if compact:
+            ratings = ratings.values(*RatingService.COMPACT_HISTORY_FIELDS)
+        else:
+            ratings = ratings.select_related('movie')
+        
+        ratings = list(ratings[:page_size + 1])
+        next_cursor = None
+        if len(ratings) > page_size:
+            ratings = ratings[:page_size]
+            last = ratings[-1]
+            if compact:
+                next_cursor = encode_cursor([last['created_at'].isoformat(), last['id']])
+            else:
+                next_cursor = encode_cursor([last.created_at.isoformat(), last.id])
+        return ratings, next_cursor
+    
+    @staticmethod
+    def get_user_rating_summary(user):
+        """Totals over a user's whole rating history with one query"""
+        summary = MovieRating.objects.filter(user=user).aggregate(
+            total_ratings=Count('id'),
+            average_rating=Avg('rating'),
+            five_star_ratings=Count('id', filter=Q(rating=5)),
+            four_plus_ratings=Count('id', filter=Q(rating__gte=4)),
+        )
+        summary['average_rating'] = round(summary['average_rating'] or 0.0, 1)
+        return summary
     
     @staticmethod
     def get_recent_ratings(limit=20):
         """Get recent ratings across all movies"""
         return MovieRating.objects.select_related('user', 'movie').order_by('-created_at')[:limit]
 
+class RatingWriteBuffer:
+    """Write-behind queue for rating aggregate updates
+
+    Rating rows are still written synchronously, but their aggregate deltas
+    are appended to PendingRatingChange instead of updating the movie's
+    RatingAggregate row. The flush_rating_buffer worker coalesces them into
+    one UPDATE per movie. The queue lives in the database because the cache
+    backend is per process and could not be seen by the worker.
+    """
+    
+    DEFAULTS = {'ENABLED': False, 'FLUSH_INTERVAL': 2, 'MAX_STALENESS': 10}
+    FLUSH_BATCH_SIZE = 5000
+    
+    @staticmethod
+    def get_settings():
+        return {**RatingWriteBuffer.DEFAULTS, **getattr(settings, 'RATINGS_WRITE_BEHIND', {})}
+    
+    @staticmethod
+    def is_enabled():
+        return RatingWriteBuffer.get_settings()['ENABLED']
+    
+    @staticmethod
+    def max_staleness():
+        return timedelta(seconds=RatingWriteBuffer.get_settings()['MAX_STALENESS'])
+    
+    @staticmethod
+    def record(movie, old_rating, new_rating, rated_on):
+        """Queue one rating change for the next flush"""
+        if old_rating == new_rating:
+            return None
+        change = PendingRatingChange.objects.create(
+            movie=movie, rated_on=rated_on, old_rating=old_rating, new_rating=new_rating
+        )
+        # Also checked on reads (see ensure_fresh), so a burst followed by
+        # silence is still flushed when the worker is not running
+        transaction.on_commit(RatingWriteBuffer.flush_if_stale)
+        return change
+    
+    FRESHNESS_CHECK_KEY = 'ratings:write_behind:checked'
+    
+    @staticmethod
+    def ensure_fresh():
+        """Flush stale queued changes before aggregates are read
+        
+        Keeps the MAX_STALENESS bound without relying on the worker. The
+        check costs one indexed query and runs at most once per second.
+        """
+        if not RatingWriteBuffer.is_enabled():
+            return 0
+        if not cache.add(RatingWriteBuffer.FRESHNESS_CHECK_KEY, True, 1):
+            return 0
+        return RatingWriteBuffer.flush_if_stale()
+    
+    @staticmethod
+    def flush_if_stale():
+        """Flush the queue if its oldest change is past the staleness bound"""
+        oldest = PendingRatingChange.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is not None and timezone.now() - oldest >= RatingWriteBuffer.max_staleness():
+            return RatingWriteBuffer.flush()
+        return 0
+    
+    @staticmethod
+    def get_deltas(movie_ids=None, change_ids=None, by_date=False):
+        """Net aggregate changes per movie from queued rating changes
+
+        Returns {movie_id: {'count_delta', 'sum_delta', 'distribution_delta'}}
+        computed with one grouped query. With by_date the keys are
+        (movie_id, rated_on) pairs, matching the daily rollup rows.
+        """
+        changes = PendingRatingChange.objects.all()
+        if movie_ids is not None:
+            changes = changes.filter(movie_id__in=movie_ids)
+        if change_ids is not None:
+            changes = changes.filter(id__in=change_ids)
+        
+        counts = {}
+        for rating_value, _ in MovieRating.RATING_CHOICES:
+            counts[f'added_{rating_value}'] = Count('id', filter=Q(new_rating=rating_value))
+            counts[f'removed_{rating_value}'] = Count('id', filter=Q(old_rating=rating_value))
+        group_by = ['movie_id', 'rated_on'] if by_date else ['movie_id']
+        rows = changes.values(*group_by).annotate(
+            added=Count('new_rating'),
+            removed=Count('old_rating'),
+            added_sum=Coalesce(Sum('new_rating'), 0),
+            removed_sum=Coalesce(Sum('old_rating'), 0),
+            **counts
+        ).order_by()
+        
+        return {
+            (row['movie_id'], row['rated_on']) if by_date else row['movie_id']: {
+                'count_delta': row['added'] - row['removed'],
+                'sum_delta': row['added_sum'] - row['removed_sum'],
+                'distribution_delta': {
+                    rating_value: row[f'added_{rating_value}'] - row[f'removed_{rating_value}']
+                    for rating_value, _ in MovieRating.RATING_CHOICES
+                },
+            }
+            for row in rows
+        }
+    
+    @staticmethod
+    def flush(batch_size=None):
+        """Apply up to batch_size queued changes and return how many were applied"""
+        batch_size = batch_size or RatingWriteBuffer.FLUSH_BATCH_SIZE
+        with transaction.atomic():
+            # skip_locked lets concurrent flushers claim disjoint batches on
+            # backends with row locks; SQLite serializes writers instead
+            change_ids = list(
+                PendingRatingChange.objects.select_for_update(skip_locked=True)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not change_ids:
+                return 0
+            
+            deltas = RatingWriteBuffer.get_deltas(change_ids=change_ids)
+            for movie_id, delta in deltas.items():
+                if not RatingAggregate.apply_deltas(movie_id, **delta):
+                    # No aggregate row yet: start from zero and apply only
+                    # the claimed changes. Rebuilding from the ratings table
+                    # would also count changes still queued, which a later
+                    # flush applies again.
+                    RatingAggregate.objects.get_or_create(movie_id=movie_id)
+                    RatingAggregate.apply_deltas(movie_id, **delta)
+            for (movie_id, rated_on), delta in RatingWriteBuffer.get_deltas(change_ids=change_ids, by_date=True).items():
+                RatingDailyRollup.apply_deltas(movie_id, rated_on, **delta)
+            PendingRatingChange.objects.filter(id__in=change_ids).delete()
+            
+            transaction.on_commit(lambda: RatingWriteBuffer._notify(deltas.keys()))
+        return len(change_ids)
+    
+    @staticmethod
+    def _notify(movie_ids):
+        with RatingLeaderboard.bulk_changes():
+            for aggregate in RatingAggregate.objects.filter(movie_id__in=list(movie_ids)):
+                rating_aggregate_updated.send(sender=RatingAggregate, instance=aggregate)
+
 class RatingCalculator:
     """Service class for advanced rating calculations and analytics"""
     
+    # Ratings lose weight linearly over a year, down to this floor
+    MIN_TIME_WEIGHT = 0.1
+    # Age in days from which every rating carries MIN_TIME_WEIGHT
+    FLOOR_WEIGHT_AGE = math.ceil(365 * (1 - MIN_TIME_WEIGHT))
+    
+    @staticmethod
+    def time_weight(age_days):
+        return max(RatingCalculator.MIN_TIME_WEIGHT, 1.0 - (age_days / 365.0))
+    
     @staticmethod
     def calculate_weighted_average_rating(movie, time_weight=True):
         """Calculate weighted average rating with optional time weighting"""
-        ratings = MovieRating.objects.filter(movie=movie)
-        
-        if not ratings.exists():
-            return 0.0
+        return RatingCalculator.calculate_weighted_average_ratings([movie.id], time_weight)[movie.id]
+    
+    @staticmethod
+    def calculate_weighted_average_ratings(movie_ids, time_weight=True):
+        """Weighted average rating for many movies from their daily rollups
+
+        Ratings are aged by their creation day. Everything older than
+        FLOOR_WEIGHT_AGE shares the floor weight and is summed in SQL, so
+        at most FLOOR_WEIGHT_AGE rows per movie are read. Returns
+        {movie_id: average}; movies without ratings map to 0.0.
+        """
+        averages = {movie_id: 0.0 for movie_id in movie_ids}
+        rollups = RatingDailyRollup.objects.filter(movie_id__in=movie_ids, count__gt=0)
         
         if not time_weight:
-            return sum(r.rating for r in ratings) / ratings.count()
+            rows = rollups.values('movie_id').annotate(total=Sum('count'), rating_sum=Sum('rating_sum')).order_by()
+            for row in rows:
+                averages[row['movie_id']] = row['rating_sum'] / row['total']
+            return averages
         
         # Time-weighted calculation (recent ratings have more weight)
-        now = timezone.now()
-        total_weight = 0
-        weighted_sum = 0
-        
-        for rating in ratings:
-            # Calculate weight based on recency (more recent = higher weight)
-            days_old = (now - rating.created_at).days
-            weight = max(0.1, 1.0 - (days_old / 365.0))  # Decay over a year
-            
-            weighted_sum += rating.rating * weight
-            total_weight += weight
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+        floor_date = today - timedelta(days=RatingCalculator.FLOOR_WEIGHT_AGE)
+        weighted_sums = dict.fromkeys(movie_ids, 0.0)
+        total_weights = dict.fromkeys(movie_ids, 0.0)
         
-        return round(weighted_sum / total_weight, 1) if total_weight > 0 else 0.0
+        old_rows = rollups.filter(date__lte=floor_date).values('movie_id').annotate(
+            total=Sum('count'), rating_sum=Sum('rating_sum')
+        ).order_by()
+        for row in old_rows:
+            weighted_sums[row['movie_id']] += row['rating_sum'] * RatingCalculator.MIN_TIME_WEIGHT
+            total_weights[row['movie_id']] += row['total'] * RatingCalculator.MIN_TIME_WEIGHT
+        
+        recent_rows = rollups.filter(date__gt=floor_date).values_list('movie_id', 'date', 'count', 'rating_sum')
+        for movie_id, date, count, rating_sum in recent_rows:
+            weight = RatingCalculator.time_weight((today - date).days)
+            weighted_sums[movie_id] += rating_sum * weight
+            total_weights[movie_id] += count * weight
+        
+        for movie_id, total_weight in total_weights.items():
+            if total_weight > 0:
+                averages[movie_id] = round(weighted_sums[movie_id] / total_weight, 1)
+        return averages
     
     @staticmethod
     def calculate_rating_trends(movie, days=30):
         """Calculate rating trends over time"""
-        from datetime import timedelta
-        
-        end_date = timezone.now()
+        return RatingCalculator.calculate_rating_trends_for_movies([movie.id], days)[movie.id]
+    
+    @staticmethod
+    def calculate_rating_trends_for_movies(movie_ids, days=30):
+        """Daily average and count of recent ratings for many movies, read from daily rollups
+
+        Covers the last ``days`` days plus today, in UTC calendar days, so
+        any window costs at most one row per movie and day. Returns
+        {movie_id: [{'date', 'average_rating', 'count'}, ...]} with days in
+        ascending order.
+        """
+        end_date = timezone.now().astimezone(dt_timezone.utc).date()
         start_date = end_date - timedelta(days=days)
         
-        ratings = MovieRating.objects.filter(
-            movie=movie,
-            created_at__gte=start_date,
-            created_at__lte=end_date
-        ).order_by('created_at')
-        
-        # Group by day and calculate daily averages
-        daily_ratings = {}
-        for rating in ratings:
-            date_key = rating.created_at.date()
-            if date_key not in daily_ratings:
-                daily_ratings[date_key] = []
-            daily_ratings[date_key].append(rating.rating)
-        
-        trends = []
-        for date, rating_list in daily_ratings.items():
-            trends.append({
+        rows = RatingDailyRollup.objects.filter(
+            movie_id__in=movie_ids,
+            date__gte=start_date,
+            date__lte=end_date,
+            count__gt=0
+        ).values_list('movie_id', 'date', 'rating_sum', 'count').order_by('movie_id', 'date')
+        
+        trends = {movie_id: [] for movie_id in movie_ids}
+        for movie_id, date, rating_sum, count in rows:
+            trends[movie_id].append({
                 'date': date,
-                'average_rating': round(sum(rating_list) / len(rating_list), 1),
-                'count': len(rating_list)
+                'average_rating': round(rating_sum / count, 1),
+                'count': count
             })
-        
         return trends
     
+    ANALYTICS_TIMEOUT = 5 * 60
+    
+    @staticmethod
+    def get_rating_analytics(movie):
+        """Return (computed_at, payload) of a movie's full rating analytics
+        
+        The payload is cached per movie for ANALYTICS_TIMEOUT and dropped
+        early when the movie's ratings, purchases or details change (the
+        'analytics' cache version). Concurrent misses share one computation.
+        """
+        version = get_movie_version(movie.id, scope='analytics')
+        return get_or_compute(
+            f'ratings:analytics:{movie.id}:v{version}',
+            lambda: RatingCalculator.calculate_rating_analytics(movie),
+            RatingCalculator.ANALYTICS_TIMEOUT
+        )
+    
+    @staticmethod
+    def calculate_rating_analytics(movie):
+        """Compute the analytics payload for a movie without caching"""
+        return {
+            'movie_id': movie.id,
+            'movie_name': movie.name,
+            'basic_stats': RatingService.get_movie_rating_stats(movie),
+            'weighted_average': RatingCalculator.calculate_weighted_average_rating(movie),
+            'trends': RatingCalculator.calculate_rating_trends(movie, days=30),
+            'correlation': RatingCalculator.get_rating_correlation_with_purchases(movie)
+        }
+    
     @staticmethod
     def get_rating_correlation_with_purchases(movie):
         """Analyze correlation between ratings and purchase patterns"""
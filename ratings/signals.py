@@ -0,0 +1,60 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from movies.autocomplete import movie_name_index
+from movies.cache import invalidate_movie
+from movies.models import Movie
+from .leaderboard import RatingLeaderboard
+from .models import MovieRating, RatingAggregate
+
+# Sent with the refreshed aggregate after an in-place F() update, which
+# bypasses post_save
+rating_aggregate_updated = Signal()
+
+
+@receiver(post_save, sender=MovieRating)
+@receiver(post_delete, sender=MovieRating)
+@receiver(post_save, sender=RatingAggregate)
+@receiver(post_delete, sender=RatingAggregate)
+@receiver(rating_aggregate_updated)
+def invalidate_rated_movie_page(sender, instance, **kwargs):
+    """Rating changes alter the cached stats on the movie's detail page"""
+    invalidate_movie(instance.movie_id)
+
+
+@receiver(post_save, sender=MovieRating)
+@receiver(post_delete, sender=MovieRating)
+@receiver(post_save, sender=RatingAggregate)
+@receiver(post_delete, sender=RatingAggregate)
+@receiver(rating_aggregate_updated)
+@receiver(post_save, sender='cart.Item')
+@receiver(post_delete, sender='cart.Item')
+@receiver(post_save, sender='geographic.MoviePurchase')
+@receiver(post_delete, sender='geographic.MoviePurchase')
+def invalidate_rating_analytics(sender, instance, **kwargs):
+    """Analytics combine rating stats with purchase counts"""
+    invalidate_movie(instance.movie_id, scope='analytics')
+
+
+@receiver(post_save, sender=RatingAggregate)
+@receiver(rating_aggregate_updated)
+def update_autocomplete_popularity(sender, instance, **kwargs):
+    movie_name_index.set_popularity(instance.movie_id, instance.total_ratings)
+
+
+@receiver(post_save, sender=RatingAggregate)
+@receiver(rating_aggregate_updated)
+def update_leaderboards(sender, instance, **kwargs):
+    RatingLeaderboard.note_aggregate_change(instance)
+
+
+@receiver(post_delete, sender=RatingAggregate)
+def remove_from_leaderboards(sender, instance, **kwargs):
+    RatingLeaderboard.note_aggregate_change(instance, deleted=True)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def refresh_leaderboard_movie(sender, instance, **kwargs):
+    """Leaderboard entries and analytics copy the movie's details"""
+    RatingLeaderboard.note_movie_change(instance.pk)
+    invalidate_movie(instance.pk, scope='analytics')
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from movies.models import Movie
+from .models import PendingRatingChange, RatingAggregate, RatingDailyRollup
+from .services import RatingService
+
+
+@override_settings(RATINGS_WRITE_BEHIND={'ENABLED': True, 'MAX_STALENESS': 3600})
+class QueuedRatingChangeTests(TestCase):
+    """Ratings queued by write-behind are neither lost nor hidden from their raters"""
+
+    def setUp(self):
+        self.movie = Movie.objects.create(name='Movie', price=10, description='A movie', image='movie_images/test.jpg')
+        for i, value in enumerate([5, 4, 4]):
+            user = User.objects.create(username=f'rater-{i}')
+            RatingService.create_or_update_rating(user, self.movie, value)
+
+    def test_rebuild_applies_queued_rollup_deltas(self):
+        self.assertEqual(PendingRatingChange.objects.count(), 3)
+
+        RatingService.rebuild_rating_aggregates()
+
+        self.assertFalse(PendingRatingChange.objects.exists())
+        aggregate = RatingAggregate.objects.get(movie=self.movie)
+        self.assertEqual((aggregate.total_ratings, aggregate.rating_sum), (3, 13))
+        rollup = RatingDailyRollup.objects.get(movie=self.movie)
+        self.assertEqual((rollup.count, rollup.rating_sum), (3, 13))
+        self.assertEqual((rollup.rating_4_count, rollup.rating_5_count), (2, 1))
+
+    def test_stats_include_queued_first_ratings(self):
+        self.assertFalse(RatingAggregate.objects.filter(movie=self.movie).exists())
+
+        stats = RatingService.get_movie_rating_stats(self.movie, include_pending=True)
+
+        self.assertEqual(stats['total_ratings'], 3)
+        self.assertEqual(stats['average_rating'], 4.3)
+        self.assertEqual(stats['rating_distribution'][4], 2)
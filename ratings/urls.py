@@ -12,6 +12,8 @@ urlpatterns = [
     path('api/submit/<int:movie_id>/', views.submit_rating_api, name='submit_rating_api'),
     path('api/delete/<int:movie_id>/', views.delete_rating_api, name='delete_rating_api'),
     path('api/movie/<int:movie_id>/', views.get_movie_rating_api, name='get_movie_rating_api'),
+    path('api/movies/', views.get_movie_ratings_batch_api, name='get_movie_ratings_batch_api'),
+    path('api/submit-batch/', views.submit_ratings_batch_api, name='submit_ratings_batch_api'),
     path('api/user-ratings/', views.get_user_ratings_api, name='get_user_ratings_api'),
     path('api/top-rated/', views.get_top_rated_movies_api, name='get_top_rated_movies_api'),
     path('api/analytics/<int:movie_id>/', views.get_rating_analytics_api, name='get_rating_analytics_api'),
@@ -1,24 +1,55 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from django.views.decorators.vary import vary_on_cookie
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
-from django.db.models import Q
+from django.db.models import DateTimeField, Max, OuterRef, Q, Subquery, Value
 import json
+import time
+from datetime import datetime, timezone as dt_timezone
 from .models import MovieRating, RatingAggregate
-from .services import RatingService, RatingCalculator
+from .services import RatingService, RatingCalculator, RatingWriteBuffer
+from movies.cache import get_catalog_changed_at, make_etag
+from movies.pagination import InvalidCursor, get_page_size
 from movies.models import Movie
+from movies.services import MovieLookupService
+
+OWN_WRITES_SESSION_KEY = 'ratings_own_writes'
+
+def remember_own_write(request, movie_id):
+    """Note in the session that this user just changed a rating on the movie"""
+    if not RatingWriteBuffer.is_enabled():
+        return
+    window = RatingWriteBuffer.max_staleness().total_seconds()
+    now = time.time()
+    writes = {
+        key: written_at
+        for key, written_at in request.session.get(OWN_WRITES_SESSION_KEY, {}).items()
+        if now - written_at < window
+    }
+    writes[str(movie_id)] = now
+    request.session[OWN_WRITES_SESSION_KEY] = writes
+
+def wants_own_writes(request, movie_id):
+    """Whether the user may still have queued changes on the movie that readers cannot see yet"""
+    if not RatingWriteBuffer.is_enabled() or not hasattr(request, 'session'):
+        return False
+    written_at = request.session.get(OWN_WRITES_SESSION_KEY, {}).get(str(movie_id))
+    return written_at is not None and time.time() - written_at < RatingWriteBuffer.max_staleness().total_seconds()
 
 class RatingView(View):
     """View for displaying movie rating interface"""
     
     @method_decorator(login_required)
     def get(self, request, movie_id):
-        movie = get_object_or_404(Movie, id=movie_id)
+        movie = MovieLookupService.get_or_404(movie_id)
         user_rating = RatingService.get_user_rating(request.user, movie)
-        rating_stats = RatingService.get_movie_rating_stats(movie)
+        rating_stats = RatingService.get_movie_rating_stats(
+            movie, include_pending=wants_own_writes(request, movie.id)
+        )
         
         # Calculate percentages for rating distribution
         rating_percentages = {}
@@ -43,7 +74,7 @@ class RatingView(View):
 def submit_rating_api(request, movie_id):
     """API endpoint to submit or update a movie rating"""
     try:
-        movie = get_object_or_404(Movie, id=movie_id)
+        movie = MovieLookupService.get_or_404(movie_id)
         data = json.loads(request.body)
         rating_value = data.get('rating')
         
@@ -63,9 +94,10 @@ def submit_rating_api(request, movie_id):
         rating, created = RatingService.create_or_update_rating(
             request.user, movie, rating_value
         )
+        remember_own_write(request, movie.id)
         
         # Get updated rating statistics
-        rating_stats = RatingService.get_movie_rating_stats(movie)
+        rating_stats = RatingService.get_movie_rating_stats(movie, include_pending=True)
         
         return JsonResponse({
             'success': True,
@@ -96,13 +128,15 @@ def submit_rating_api(request, movie_id):
 def delete_rating_api(request, movie_id):
     """API endpoint to delete a user's rating for a movie"""
     try:
-        movie = get_object_or_404(Movie, id=movie_id)
+        movie = MovieLookupService.get_or_404(movie_id)
         
         success = RatingService.delete_rating(request.user, movie)
         
         if success:
+            remember_own_write(request, movie.id)
+            
             # Get updated rating statistics
-            rating_stats = RatingService.get_movie_rating_stats(movie)
+            rating_stats = RatingService.get_movie_rating_stats(movie, include_pending=True)
             
             return JsonResponse({
                 'success': True,
@@ -121,11 +155,58 @@ def delete_rating_api(request, movie_id):
             'error': str(e)
         }, status=500)
 
+def movie_rating_metadata(request, movie_id):
+    """Timestamps behind a movie's rating stats and the caller's own rating.
+
+    Fetched with a single query and memoized on the request, so the ETag
+    and Last-Modified checks cost one lookup together. Returns None for an
+    unknown movie so the view can respond as usual.
+    """
+    if not hasattr(request, '_rating_metadata'):
+        # Apply stale write-behind changes before they are validated against
+        RatingWriteBuffer.ensure_fresh()
+        user_rating_updated = Value(None, output_field=DateTimeField())
+        if request.user.is_authenticated:
+            user_rating_updated = Subquery(
+                MovieRating.objects.filter(movie=OuterRef('pk'), user=request.user).values('updated_at')[:1]
+            )
+        row = Movie.objects.filter(id=movie_id).annotate(
+            user_rating_updated=user_rating_updated
+        ).values_list('rating_aggregate__last_updated', 'user_rating_updated').first()
+
+        metadata = None
+        if row is not None:
+            stats_updated, user_updated = row
+            metadata = {
+                'stats_updated': stats_updated,
+                'user_updated': user_updated,
+                'last_modified': max(filter(None, [get_catalog_changed_at(), stats_updated, user_updated])),
+            }
+        request._rating_metadata = metadata
+    return request._rating_metadata
+
+def movie_rating_etag(request, movie_id):
+    metadata = movie_rating_metadata(request, movie_id)
+    if metadata is None:
+        return None
+    return make_etag(
+        'rating', movie_id, metadata['last_modified'].timestamp(),
+        metadata['stats_updated'], metadata['user_updated'], request.user.pk
+    )
+
+def movie_rating_last_modified(request, movie_id):
+    metadata = movie_rating_metadata(request, movie_id)
+    return metadata['last_modified'] if metadata else None
+
+@vary_on_cookie
+@condition(etag_func=movie_rating_etag, last_modified_func=movie_rating_last_modified)
 def get_movie_rating_api(request, movie_id):
     """API endpoint to get rating statistics for a movie"""
     try:
-        movie = get_object_or_404(Movie, id=movie_id)
-        rating_stats = RatingService.get_movie_rating_stats(movie)
+        movie = MovieLookupService.get_or_404(movie_id)
+        rating_stats = RatingService.get_movie_rating_stats(
+            movie, include_pending=wants_own_writes(request, movie.id)
+        )
         
         # Add user's rating if authenticated
         user_rating = None
@@ -153,27 +234,197 @@ def get_movie_rating_api(request, movie_id):
             'error': str(e)
         }, status=500)
 
+MAX_BATCH_SIZE = 100
+
+def parse_movie_ids(value):
+    """Parse a comma separated list of movie ids, dropping duplicates"""
+    movie_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if part:
+            movie_id = int(part)
+            if movie_id not in movie_ids:
+                movie_ids.append(movie_id)
+    return movie_ids
+
+def serialize_user_rating(rating):
+    if rating is None:
+        return None
+    return {
+        'rating': rating.rating,
+        'created_at': rating.created_at.isoformat()
+    }
+
+@vary_on_cookie
+def get_movie_ratings_batch_api(request):
+    """API endpoint to get rating statistics and the caller's ratings for many movies
+
+    Takes ?ids=1,2,3 and answers with two queries however many ids are given.
+    """
+    try:
+        movie_ids = parse_movie_ids(request.GET.get('ids', ''))
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'ids must be a comma separated list of movie ids'
+        }, status=400)
+    
+    if not movie_ids or len(movie_ids) > MAX_BATCH_SIZE:
+        return JsonResponse({
+            'success': False,
+            'error': f'Between 1 and {MAX_BATCH_SIZE} movie ids are required'
+        }, status=400)
+    
+    try:
+        include_pending_for = [movie_id for movie_id in movie_ids if wants_own_writes(request, movie_id)]
+        stats = RatingService.get_movie_rating_stats_many(movie_ids, include_pending_for)
+        
+        user_ratings = {}
+        if request.user.is_authenticated:
+            user_ratings = RatingService.get_user_ratings(request.user, movie_ids)
+        
+        return JsonResponse({
+            'success': True,
+            'data': [
+                {
+                    'movie_id': movie_id,
+                    'rating_stats': stats[movie_id],
+                    'user_rating': serialize_user_rating(user_ratings.get(movie_id))
+                }
+                for movie_id in movie_ids
+            ]
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
 @login_required
-def get_user_ratings_api(request):
-    """API endpoint to get user's rating history"""
+@csrf_exempt
+@require_http_methods(["POST"])
+def submit_ratings_batch_api(request):
+    """API endpoint to submit or update many ratings in one transaction
+
+    Expects {"ratings": [{"movie_id": 1, "rating": 4}, ...]}.
+    """
     try:
-        ratings = RatingService.get_user_rating_history(request.user)
+        data = json.loads(request.body)
+        entries = data.get('ratings')
+        if not isinstance(entries, list) or not entries or len(entries) > MAX_BATCH_SIZE:
+            return JsonResponse({
+                'success': False,
+                'error': f'ratings must be a list of 1 to {MAX_BATCH_SIZE} entries'
+            }, status=400)
         
-        rating_data = []
-        for rating in ratings:
-            rating_data.append({
-                'id': rating.id,
-                'movie_id': rating.movie.id,
-                'movie_name': rating.movie.name,
-                'movie_image': rating.movie.image.url if rating.movie.image else None,
-                'rating': rating.rating,
-                'created_at': rating.created_at.isoformat(),
-                'updated_at': rating.updated_at.isoformat()
-            })
+        ratings = {}
+        for entry in entries:
+            movie_id = entry.get('movie_id') if isinstance(entry, dict) else None
+            rating_value = entry.get('rating') if isinstance(entry, dict) else None
+            if not isinstance(movie_id, int) or not isinstance(rating_value, int):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Each entry needs an integer movie_id and rating'
+                }, status=400)
+            if not (1 <= rating_value <= 5):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Rating must be between 1 and 5'
+                }, status=400)
+            ratings[movie_id] = rating_value
+        
+        try:
+            results = RatingService.create_or_update_ratings(request.user, ratings)
+        except Movie.DoesNotExist as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=404)
+        
+        for movie_id in ratings:
+            remember_own_write(request, movie_id)
+        stats = RatingService.get_movie_rating_stats_many(list(ratings), include_pending_for=list(ratings))
+        
+        return JsonResponse({
+            'success': True,
+            'data': [
+                {
+                    'movie_id': movie_id,
+                    'created': created,
+                    'rating': {
+                        'id': rating.id,
+                        'rating': rating.rating,
+                        'created_at': rating.created_at.isoformat(),
+                        'updated_at': rating.updated_at.isoformat()
+                    },
+                    'movie_stats': stats[movie_id]
+                }
+                for movie_id, (rating, created) in results.items()
+            ]
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+@login_required
+def get_user_ratings_api(request):
+    """API endpoint to page through the user's rating history with a keyset cursor
+
+    Pass ?compact=1 to get only ids, ratings and timestamps.
+    """
+    page_size = get_page_size(
+        request.GET.get('limit'), RatingService.HISTORY_PAGE_SIZE, RatingService.MAX_HISTORY_PAGE_SIZE
+    )
+    compact = request.GET.get('compact') in ('1', 'true')
+    try:
+        ratings, next_cursor = RatingService.get_user_rating_page(
+            request.user, request.GET.get('cursor'), page_size, compact=compact
+        )
+    except InvalidCursor:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=400)
+    
+    try:
+        if compact:
+            rating_data = [
+                {
+                    'id': rating['id'],
+                    'movie_id': rating['movie_id'],
+                    'rating': rating['rating'],
+                    'created_at': rating['created_at'].isoformat(),
+                    'updated_at': rating['updated_at'].isoformat()
+                }
+                for rating in ratings
+            ]
+        else:
+            rating_data = [
+                {
+                    'id': rating.id,
+                    'movie_id': rating.movie.id,
+                    'movie_name': rating.movie.name,
+                    'movie_image': rating.movie.thumbnail_url,
+                    'rating': rating.rating,
+                    'created_at': rating.created_at.isoformat(),
+                    'updated_at': rating.updated_at.isoformat()
+                }
+                for rating in ratings
+            ]
         
         return JsonResponse({
             'success': True,
-            'data': rating_data
+            'data': rating_data,
+            'next': next_cursor
         })
         
     except Exception as e:
@@ -182,29 +433,27 @@ def get_user_ratings_api(request):
             'error': str(e)
         }, status=500)
 
+def top_rated_metadata(request):
+    if not hasattr(request, '_top_rated_last_modified'):
+        RatingWriteBuffer.ensure_fresh()
+        ratings_updated = RatingAggregate.objects.aggregate(updated=Max('last_updated'))['updated']
+        request._top_rated_last_modified = max(filter(None, [get_catalog_changed_at(), ratings_updated]))
+    return request._top_rated_last_modified
+
+def top_rated_etag(request):
+    return make_etag(
+        'top-rated', top_rated_metadata(request).timestamp(), RatingService.get_leaderboard_limit(request.GET.get('limit'))
+    )
+
+def top_rated_last_modified(request):
+    return top_rated_metadata(request)
+
+@condition(etag_func=top_rated_etag, last_modified_func=top_rated_last_modified)
 def get_top_rated_movies_api(request):
     """API endpoint to get top rated movies"""
     try:
-        limit = int(request.GET.get('limit', 10))
-        movies = RatingService.get_top_rated_movies(limit)
-        
-        movie_data = []
-        for aggregate in movies:
-            movie_data.append({
-                'id': aggregate.movie.id,
-                'name': aggregate.movie.name,
-                'image': aggregate.movie.image.url if aggregate.movie.image else None,
-                'price': aggregate.movie.price,
-                'average_rating': aggregate.average_rating,
-                'total_ratings': aggregate.total_ratings,
-                'rating_distribution': {
-                    1: aggregate.rating_1_count,
-                    2: aggregate.rating_2_count,
-                    3: aggregate.rating_3_count,
-                    4: aggregate.rating_4_count,
-                    5: aggregate.rating_5_count,
-                }
-            })
+        limit = RatingService.get_leaderboard_limit(request.GET.get('limit'))
+        movie_data = RatingService.get_top_rated_movies(limit)
         
         return JsonResponse({
             'success': True,
@@ -220,30 +469,15 @@ def get_top_rated_movies_api(request):
 def get_rating_analytics_api(request, movie_id):
     """API endpoint to get detailed rating analytics for a movie"""
     try:
-        movie = get_object_or_404(Movie, id=movie_id)
-        
-        # Get basic rating stats
-        rating_stats = RatingService.get_movie_rating_stats(movie)
-        
-        # Get weighted average
-        weighted_avg = RatingCalculator.calculate_weighted_average_rating(movie)
+        movie = MovieLookupService.get_or_404(movie_id)
         
-        # Get rating trends (last 30 days)
-        trends = RatingCalculator.calculate_rating_trends(movie, days=30)
-        
-        # Get correlation with purchases
-        correlation = RatingCalculator.get_rating_correlation_with_purchases(movie)
+        computed_at, analytics = RatingCalculator.get_rating_analytics(movie)
         
         return JsonResponse({
             'success': True,
-            'data': {
-                'movie_id': movie.id,
-                'movie_name': movie.name,
-                'basic_stats': rating_stats,
-                'weighted_average': weighted_avg,
-                'trends': trends,
-                'correlation': correlation
-            }
+            'data': analytics,
+            'computed_at': datetime.fromtimestamp(computed_at, tz=dt_timezone.utc).isoformat(),
+            'age_seconds': round(max(time.time() - computed_at, 0), 1)
         })
         
     except Exception as e:
@@ -255,10 +489,18 @@ def get_rating_analytics_api(request, movie_id):
 @login_required
 def my_ratings_view(request):
     """View for displaying user's rating history"""
-    ratings = RatingService.get_user_rating_history(request.user)
+    cursor = request.GET.get('cursor')
+    try:
+        ratings, next_cursor = RatingService.get_user_rating_page(request.user, cursor)
+    except InvalidCursor:
+        cursor = None
+        ratings, next_cursor = RatingService.get_user_rating_page(request.user)
     
     context = {
         'title': 'My Movie Ratings',
-        'ratings': ratings
+        'ratings': ratings,
+        'summary': RatingService.get_user_rating_summary(request.user),
+        'is_first_page': not cursor,
+        'next_cursor': next_cursor,
     }
     return render(request, 'ratings/my_ratings.html', context)
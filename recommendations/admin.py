@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import MovieNeighbor, SimilarityBuild
+
+@admin.register(MovieNeighbor)
+class MovieNeighborAdmin(admin.ModelAdmin):
+    list_display = ['movie', 'neighbor', 'similarity', 'support']
+    search_fields = ['movie__name', 'neighbor__name']
+    ordering = ['movie', '-similarity']
+
+@admin.register(SimilarityBuild)
+class SimilarityBuildAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'finished_at', 'full', 'movies_refreshed', 'ratings_read']
+    list_filter = ['full']
@@ -0,0 +1,216 @@
+import heapq
+from collections import defaultdict
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from ratings.models import MovieRating, RatingAggregate
+from .models import MovieNeighbor, SimilarityBuild
+
+# Upper bound on the cells of each dense block (rating rows, dot products)
+BLOCK_CELLS = 4_000_000
+
+
+class ItemSimilarityBuilder:
+    """Offline item-item similarity build over MovieRating.
+
+    Each movie is a sparse vector of its ratings, centered on the movie's
+    mean rating. Similarity is the cosine of two such vectors. Means and
+    norms come from one grouped query over the same ratings as the dot
+    products. The ratings are loaded into a user x movie matrix and the dot
+    products R^T R are computed with NumPy, one block of movies at a time
+    and only over the users who rated a movie in the block, so memory stays
+    bounded by BLOCK_CELLS whatever the catalog size. The top k neighbors of
+    each movie are kept.
+    """
+
+    def __init__(self, k=20, min_support=2, chunk_size=10000):
+        self.k = k
+        self.min_support = min_support
+        self.chunk_size = chunk_size
+        self.ratings_read = 0
+
+    @staticmethod
+    def load_item_stats():
+        """(movie ids, means, norms of the centered rating vectors) as arrays sorted by movie id"""
+        rows = MovieRating.objects.values('movie_id').annotate(
+            total=Count('id'), rating_sum=Sum('rating'), square_sum=Sum(F('rating') * F('rating'))
+        ).order_by('movie_id').values_list('movie_id', 'total', 'rating_sum', 'square_sum')
+        stats = np.array(list(rows), dtype=np.float64).reshape(-1, 4)
+        movie_ids, totals, sums, square_sums = stats.T
+        means = sums / np.maximum(totals, 1)
+        norms = np.sqrt(np.maximum(square_sums - sums * means, 0.0))
+        return movie_ids.astype(np.int64), means, norms
+
+    def load_matrix(self, ratings, movie_ids, means):
+        """The centered ratings as a user x movie matrix in CSR form: (row starts, columns, values)"""
+        chunks = []
+        batch = []
+        for row in ratings.values_list('user_id', 'movie_id', 'rating').iterator(chunk_size=self.chunk_size):
+            batch.append(row)
+            if len(batch) == self.chunk_size:
+                chunks.append(np.array(batch, dtype=np.int64))
+                batch = []
+        chunks.append(np.array(batch, dtype=np.int64).reshape(-1, 3))
+        data = np.concatenate(chunks)
+        self.ratings_read += len(data)
+
+        # Ratings of movies missing from the stats were made after they were read
+        columns = np.searchsorted(movie_ids, data[:, 1])
+        known = (columns < len(movie_ids)) & (movie_ids[np.minimum(columns, len(movie_ids) - 1)] == data[:, 1])
+        data, columns = data[known], columns[known]
+
+        order = np.argsort(data[:, 0], kind='stable')
+        _, rows = np.unique(data[order, 0], return_inverse=True)
+        columns = columns[order]
+        values = data[order, 2] - means[columns]
+        starts = np.concatenate(([0], np.cumsum(np.bincount(rows)))) if len(rows) else np.zeros(1, dtype=np.int64)
+        return starts, columns, values
+
+    def similarity_rows(self, matrix, norms, items):
+        """Yield (item, other items, similarities, supports) for each given column index
+
+        Others are the items sharing at least min_support raters with a
+        positive similarity.
+        """
+        starts, columns, values = matrix
+        item_count = len(norms)
+        block_size = max(1, BLOCK_CELLS // max(item_count, 1))
+        user_rows = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+        for block_start in range(0, len(items), block_size):
+            block = items[block_start:block_start + block_size]
+            in_block = np.zeros(item_count, dtype=bool)
+            in_block[block] = True
+            block_users = np.unique(user_rows[in_block[columns]])
+
+            dots = np.zeros((len(block), item_count))
+            supports = np.zeros((len(block), item_count))
+            for users in np.array_split(block_users, max(1, -(-len(block_users) * item_count // BLOCK_CELLS))):
+                lengths = starts[users + 1] - starts[users]
+                entries = np.repeat(starts[users] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+                positions = (np.repeat(np.arange(len(users)), lengths), columns[entries])
+                ratings = np.zeros((len(users), item_count))
+                ratings[positions] = values[entries]
+                rated = np.zeros((len(users), item_count))
+                rated[positions] = 1.0
+                dots += ratings[:, block].T @ ratings
+                supports += rated[:, block].T @ rated
+
+            norm_products = np.outer(norms[block], norms)
+            keep = (supports >= self.min_support) & (dots > 0) & (norm_products > 0)
+            keep[np.arange(len(block)), block] = False
+            similarities = np.divide(dots, norm_products, out=np.zeros_like(dots), where=keep)
+            for position, item in enumerate(block):
+                others = np.flatnonzero(keep[position])
+                yield item, others, similarities[position, others], supports[position, others]
+
+    def top_neighbors(self, movie_ids, others, similarities, supports):
+        """The k best (similarity, neighbor id, support) of one movie"""
+        return heapq.nlargest(self.k, zip(
+            similarities.tolist(), movie_ids[others].tolist(), supports.astype(np.int64).tolist()
+        ))
+
+    def build(self):
+        """Recompute every movie's neighbors from all ratings"""
+        build = SimilarityBuild.objects.create(started_at=timezone.now(), full=True)
+        movie_ids, means, norms = self.load_item_stats()
+        matrix = self.load_matrix(MovieRating.objects.all(), movie_ids, means)
+
+        heaps = {}
+        for item, others, similarities, supports in self.similarity_rows(matrix, norms, np.arange(len(movie_ids))):
+            if len(others):
+                heaps[int(movie_ids[item])] = self.top_neighbors(movie_ids, others, similarities, supports)
+
+        with transaction.atomic():
+            MovieNeighbor.objects.all().delete()
+            MovieNeighbor.objects.bulk_create(self._neighbor_rows(heaps), batch_size=1000)
+        return self._finish(build, len(movie_ids))
+
+    def refresh(self, movie_ids):
+        """Recompute the neighbors of the given movies from the ratings of their raters
+
+        Their lists are rebuilt exactly. Other movies' lists are patched
+        where one of these movies enters, moves or leaves; a movie that
+        drops out is not replaced by one outside the list until the next
+        full build.
+        """
+        build = SimilarityBuild.objects.create(started_at=timezone.now(), full=False)
+        targets = set(movie_ids)
+        ids, means, norms = self.load_item_stats()
+        raters = MovieRating.objects.filter(movie_id__in=targets).values('user_id')
+        matrix = self.load_matrix(MovieRating.objects.filter(user_id__in=raters), ids, means)
+        items = np.flatnonzero(np.isin(ids, list(targets)))
+
+        heaps = {}
+        reverse = defaultdict(dict)
+        for item, others, similarities, supports in self.similarity_rows(matrix, norms, items):
+            movie_id = int(ids[item])
+            if len(others):
+                heaps[movie_id] = self.top_neighbors(ids, others, similarities, supports)
+            for other_id, similarity, support in zip(ids[others].tolist(), similarities.tolist(), supports.tolist()):
+                if other_id not in targets:
+                    reverse[other_id][movie_id] = (similarity, int(support))
+
+        with transaction.atomic():
+            MovieNeighbor.objects.filter(movie_id__in=targets).delete()
+            MovieNeighbor.objects.bulk_create(self._neighbor_rows(heaps), batch_size=1000)
+            self._patch_reverse(targets, reverse)
+        return self._finish(build, len(targets))
+
+    def _patch_reverse(self, targets, reverse):
+        """Apply new similarities to the stored lists of movies that were not rebuilt"""
+        current = defaultdict(dict)
+        rows = MovieNeighbor.objects.filter(
+            Q(neighbor_id__in=targets) | Q(movie_id__in=list(reverse))
+        ).exclude(movie_id__in=targets)
+        for row in rows:
+            current[row.movie_id][row.neighbor_id] = row
+
+        to_delete = []
+        to_update = []
+        to_create = []
+        for movie_id in set(current) | set(reverse):
+            listed = current[movie_id]
+            updated = reverse.get(movie_id, {})
+            entries = {
+                neighbor_id: (row.similarity, row.support)
+                for neighbor_id, row in listed.items() if neighbor_id not in targets
+            }
+            entries.update(updated)
+            keep = set(heapq.nlargest(self.k, entries, key=lambda neighbor_id: entries[neighbor_id]))
+
+            for neighbor_id, row in listed.items():
+                if neighbor_id not in keep:
+                    to_delete.append(row.id)
+                elif neighbor_id in updated:
+                    row.similarity, row.support = updated[neighbor_id]
+                    to_update.append(row)
+            for neighbor_id in keep - listed.keys():
+                similarity, support = entries[neighbor_id]
+                to_create.append(MovieNeighbor(
+                    movie_id=movie_id, neighbor_id=neighbor_id, similarity=similarity, support=support
+                ))
+
+        MovieNeighbor.objects.filter(id__in=to_delete).delete()
+        MovieNeighbor.objects.bulk_update(to_update, ['similarity', 'support'], batch_size=1000)
+        MovieNeighbor.objects.bulk_create(to_create, batch_size=1000)
+
+    @staticmethod
+    def _neighbor_rows(heaps):
+        for movie_id, heap in heaps.items():
+            for similarity, neighbor_id, support in heap:
+                yield MovieNeighbor(movie_id=movie_id, neighbor_id=neighbor_id, similarity=similarity, support=support)
+
+    def _finish(self, build, movies_refreshed):
+        build.finished_at = timezone.now()
+        build.movies_refreshed = movies_refreshed
+        build.ratings_read = self.ratings_read
+        build.save()
+        return build
+
+    @staticmethod
+    def changed_movie_ids(since):
+        """Movies whose ratings were added, changed or removed since a time"""
+        rated = MovieRating.objects.filter(updated_at__gte=since).values_list('movie_id', flat=True).distinct()
+        aggregated = RatingAggregate.objects.filter(last_updated__gte=since).values_list('movie_id', flat=True)
+        return set(rated) | set(aggregated)
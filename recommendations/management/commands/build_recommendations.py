@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from recommendations.engine import ItemSimilarityBuilder
+from recommendations.models import SimilarityBuild
+
+class Command(BaseCommand):
+    help = 'Build the item-item similarity table behind "recommended for you"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every movie instead of only changed ones')
+        parser.add_argument('--k', type=int, default=20, help='Neighbors kept per movie')
+        parser.add_argument('--min-support', type=int, default=2, help='Minimum users who rated both movies')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Ratings fetched per database round trip')
+
+    def handle(self, *args, **options):
+        builder = ItemSimilarityBuilder(
+            k=options['k'],
+            min_support=options['min_support'],
+            chunk_size=options['chunk_size'],
+        )
+        last_build = SimilarityBuild.objects.filter(finished_at__isnull=False).first()
+        start = time.perf_counter()
+
+        if options['full'] or last_build is None:
+            self.stdout.write('Building similarities for all movies...')
+            build = builder.build()
+        else:
+            changed = builder.changed_movie_ids(last_build.started_at)
+            if not changed:
+                self.stdout.write(self.style.SUCCESS(f'No ratings changed since {last_build.started_at:%Y-%m-%d %H:%M:%S}'))
+                return
+            self.stdout.write(f'Refreshing similarities for {len(changed)} changed movies...')
+            build = builder.refresh(changed)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Refreshed {build.movies_refreshed} movies from {build.ratings_read} ratings in {elapsed:.1f}s'
+            )
+        )
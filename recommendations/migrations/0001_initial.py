@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('movies', '0005_review_movie_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityBuild',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('full', models.BooleanField(default=True)),
+                ('movies_refreshed', models.IntegerField(default=0)),
+                ('ratings_read', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieNeighbor',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('similarity', models.FloatField()),
+                ('support', models.IntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='movies.movie')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['movie', '-similarity'], name='recommendat_movie_i_ac62cd_idx')],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'neighbor'), name='unique_movie_neighbor')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import models
+from movies.models import Movie
+
+class MovieNeighbor(models.Model):
+    """One of a movie's k most similar movies, from the last similarity build"""
+    id = models.BigAutoField(primary_key=True)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField()
+    # Users who rated both movies when the similarity was computed
+    support = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'neighbor'], name='unique_movie_neighbor'),
+        ]
+        indexes = [
+            models.Index(fields=['movie', '-similarity']),
+        ]
+    
+    def __str__(self):
+        return f"{self.movie_id} ~ {self.neighbor_id} ({self.similarity:.3f})"
+
+class SimilarityBuild(models.Model):
+    """A run of the similarity builder, used to find ratings changed since"""
+    id = models.AutoField(primary_key=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=True)
+    movies_refreshed = models.IntegerField(default=0)
+    ratings_read = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        kind = 'Full' if self.full else 'Incremental'
+        return f"{kind} build at {self.started_at:%Y-%m-%d %H:%M} ({self.movies_refreshed} movies)"
@@ -0,0 +1,41 @@
+import heapq
+from collections import defaultdict
+from movies.services import MovieLookupService
+from ratings.models import MovieRating
+from .models import MovieNeighbor
+
+class RecommendationService:
+    """Service class for scoring recommendations from the movie neighbor table"""
+    
+    # Ratings above this pull a movie's neighbors up, ratings below push them down
+    NEUTRAL_RATING = 3
+    # Only the user's most recent ratings are used as evidence
+    PROFILE_SIZE = 200
+    
+    @staticmethod
+    def recommend_for_user(user, limit=10):
+        """Return [(movie, score), ...] of unrated movies, best first
+        
+        Each candidate scores the sum, over the movies the user rated, of
+        similarity times how far the rating is from neutral. This costs two
+        indexed queries plus cached movie lookups.
+        """
+        profile = dict(
+            MovieRating.objects.filter(user=user).order_by('-created_at').values_list('movie_id', 'rating')[
+                :RecommendationService.PROFILE_SIZE
+            ]
+        )
+        if not profile:
+            return []
+        
+        neighbors = MovieNeighbor.objects.filter(movie_id__in=list(profile)).exclude(
+            neighbor_id__in=MovieRating.objects.filter(user=user).values('movie_id')
+        ).values_list('movie_id', 'neighbor_id', 'similarity')
+        
+        scores = defaultdict(float)
+        for movie_id, neighbor_id, similarity in neighbors:
+            scores[neighbor_id] += similarity * (profile[movie_id] - RecommendationService.NEUTRAL_RATING)
+        
+        best = heapq.nlargest(limit, ((score, movie_id) for movie_id, score in scores.items() if score > 0))
+        movies = MovieLookupService.get_many(movie_id for _, movie_id in best)
+        return [(movies[movie_id], score) for score, movie_id in best if movie_id in movies]
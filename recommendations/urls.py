@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'recommendations'
+
+urlpatterns = [
+    path('api/for-you/', views.recommended_for_you_api, name='recommended_for_you_api'),
+]
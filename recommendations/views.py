@@ -0,0 +1,31 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from movies.pagination import get_page_size
+from .services import RecommendationService
+
+@login_required
+def recommended_for_you_api(request):
+    """API endpoint listing movies recommended for the current user"""
+    try:
+        limit = get_page_size(request.GET.get('limit'), 10, 50)
+        recommendations = RecommendationService.recommend_for_user(request.user, limit)
+        
+        return JsonResponse({
+            'success': True,
+            'data': [
+                {
+                    'id': movie.id,
+                    'name': movie.name,
+                    'image': movie.thumbnail_url,
+                    'price': movie.price,
+                    'score': round(score, 4)
+                }
+                for movie, score in recommendations
+            ]
+        })
+        
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)